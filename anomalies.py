@@ -0,0 +1,236 @@
+"""
+增量异常检测：ingest 摄入新文件后运行，只给新增的上传日打分 (生涯序列从 state.json 里保存的窗口接着算)。
+  - 生涯日增: 相邻两次上传之间的 career_total 差按日历天均分 (断档日标记 Estimated)，
+    非正增长或超过前 WINDOW 天中位数 SPIKE_FACTOR 倍的记为 Invalid (数据错误，不进趋势图)，
+    其余用稳健 z 分数 (中位数 / MAD) 标记 Outlier (真实的发行/节日高峰，保留但做标记)
+  - 单曲/专辑: 每个条目当天的 Daily 相对前 WINDOW 个上传日的稳健 z 分数，超过阈值记为异常
+结果写在 <store_dir>/anomalies/ 下 (career.parquet / songs.parquet / albums.parquet / state.json)，
+看板直接读取，无需重新扫描历史。
+"""
+import os
+import json
+import warnings
+import numpy as np
+import pandas as pd
+
+import history_store
+import memcache
+import song_index
+from data_utils import DATA_DIR
+
+ANOMALY_DIR = "anomalies"
+STATE_VERSION = 2
+WINDOW = 14
+MIN_PERIODS = 7
+Z_THRESHOLD = 5.0
+# 偏离中位数不足此值的不算异常 (避免冷门曲目的小波动被放大)
+MIN_ABS_DEVIATION = 10_000
+# 生涯日增超过近期中位数的倍数即视为数据错误 (取代旧版写死的 1 亿上限)
+SPIKE_FACTOR = 10
+# 0.6745 * (x - median) / MAD 与正态分布下的 z 分数同尺度
+MAD_SCALE = 0.6745
+
+_CACHE = memcache.SHARED
+
+def _path(store_dir, name):
+    return os.path.join(store_dir, ANOMALY_DIR, name)
+
+def _params():
+    return [WINDOW, MIN_PERIODS, Z_THRESHOLD, MIN_ABS_DEVIATION, SPIKE_FACTOR]
+
+def _empty_flags():
+    return pd.DataFrame({'Date': pd.Series(dtype=str), 'Name': pd.Series(dtype=str), 'Daily': pd.Series(dtype='int64'),
+                         'Median': pd.Series(dtype='float64'), 'Z': pd.Series(dtype='float64')})
+
+# --- 打分 ---
+def robust_z(values, window):
+    """
+    values: [条目]，window: [天 × 条目] (NaN 为缺失)。
+    返回 (z, median)；窗口内有效值少于 MIN_PERIODS 的条目 z 为 NaN。
+    """
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", category=RuntimeWarning)
+        med = np.nanmedian(window, axis=0) if len(window) else np.full(len(values), np.nan)
+        mad = np.nanmedian(np.abs(window - med), axis=0) if len(window) else np.full(len(values), np.nan)
+    # MAD 为 0 (数值完全平稳) 时用中位数的 1% 兜底，避免除零
+    scale = np.maximum(mad, np.maximum(np.abs(med) * 0.01, 1.0))
+    z = MAD_SCALE * (values - med) / scale
+    z[(~np.isnan(window)).sum(axis=0) < MIN_PERIODS] = np.nan
+    return z, med
+
+def _is_outlier(values, z, med):
+    with np.errstate(invalid='ignore'):
+        return (np.abs(z) > Z_THRESHOLD) & (np.abs(values - med) >= MIN_ABS_DEVIATION)
+
+def split_gaps(dates, totals):
+    """
+    相邻两次上传之间的总量差按日历天均分 (余数记在最后一天，合计与总量差一致):
+    DataFrame[Date, Daily, Span, Estimated]，Span 为这次差值覆盖的天数，断档补出的日期 Estimated=True。
+    """
+    d = np.asarray(pd.to_datetime(pd.Series(dates)).to_numpy(), dtype='datetime64[D]')
+    t = np.asarray(totals, dtype='int64')
+    if len(d) < 2:
+        return pd.DataFrame({'Date': pd.Series(dtype=str), 'Daily': pd.Series(dtype='int64'),
+                             'Span': pd.Series(dtype='int64'), 'Estimated': pd.Series(dtype=bool)})
+    span = np.maximum(np.diff(d).astype('int64'), 1)
+    delta = np.diff(t)
+    rep = np.repeat(np.arange(len(span)), span)
+    offset = np.arange(len(rep)) - np.repeat(np.cumsum(span) - span, span)
+    base = delta // span
+    daily = base[rep] + np.where(offset == span[rep] - 1, (delta - base * span)[rep], 0)
+    return pd.DataFrame({
+        'Date': np.datetime_as_string(d[:-1][rep] + 1 + offset, unit='D').astype(object),
+        'Daily': daily.astype('int64'),
+        'Span': span[rep],
+        'Estimated': offset < span[rep] - 1,
+    })
+
+def career_series(meta, prev=None):
+    """
+    生涯日增的逐日序列: split_gaps 的结果加上 Invalid / Z / Outlier 列 (Invalid 的日期不进入后续窗口)。
+    prev: 上次处理到的状态 (见 _career)，给出时 meta 只含其后的新上传，只给新增的日期打分。
+    """
+    return _career(meta, prev)[0]
+
+def _career(meta, prev=None):
+    """
+    返回 (逐日序列, 状态)；状态为下次增量打分需要的 {date, total, window}:
+    最后一次上传的日期与 career_total，以及最近 WINDOW 天的 Daily (Invalid 为 None)
+    """
+    dates, totals, window = list(meta['Date']), list(meta['career_total']), []
+    if prev is not None:
+        dates, totals, window = [prev['date'], *dates], [prev['total'], *totals], prev['window']
+    hist = split_gaps(dates, totals)
+    # 前 n 个是上次留下的窗口，其后是本次的逐日值
+    n = len(window)
+    values = np.concatenate([np.array([np.nan if v is None else v for v in window], dtype='float64'),
+                             hist['Daily'].to_numpy(dtype='float64')])
+    invalid = np.zeros(len(values), dtype=bool)
+    invalid[n:] = values[n:] <= 0
+    values[invalid] = np.nan
+    z = np.full(len(values), np.nan)
+    outlier = np.zeros(len(values), dtype=bool)
+    for i in range(n, len(values)):
+        if invalid[i]: continue
+        zi, med = robust_z(values[i:i + 1], values[max(0, i - WINDOW):i, None])
+        if np.isfinite(med[0]) and values[i] > SPIKE_FACTOR * med[0]:
+            invalid[i], values[i] = True, np.nan
+            continue
+        z[i] = zi[0]
+        outlier[i] = _is_outlier(values[i:i + 1], zi, med)[0]
+    hist['Invalid'] = invalid[n:]
+    hist['Z'] = z[n:]
+    hist['Outlier'] = outlier[n:]
+    state = prev if not len(dates) else {
+        "date": str(dates[-1]), "total": int(totals[-1]),
+        "window": [None if np.isnan(v) else float(v) for v in values[-WINDOW:]],
+    }
+    return hist, state
+
+def item_flags(compact, start=0):
+    """从第 start 个上传日起逐日给所有条目打分，返回异常 DataFrame[Date, Name, Daily, Median, Z]"""
+    daily, present, names = compact['Daily'], compact['present'], compact['names']
+    dates = np.datetime_as_string(compact['dates'], unit='D')
+    parts = []
+    for i in range(max(start, MIN_PERIODS), len(dates)):
+        lo = max(0, i - WINDOW)
+        window = np.where(present[lo:i], daily[lo:i], np.nan)
+        today = np.where(present[i], daily[i], np.nan)
+        z, med = robust_z(today, window)
+        hit = np.flatnonzero(_is_outlier(today, z, med))
+        if len(hit):
+            parts.append(pd.DataFrame({'Date': dates[i], 'Name': names[hit].astype(object), 'Daily': daily[i, hit],
+                                       'Median': med[hit], 'Z': z[hit]}))
+    if not parts: return _empty_flags()
+    return pd.concat(parts, ignore_index=True)
+
+# --- 增量更新与持久化 ---
+def _load_state(store_dir):
+    try:
+        with open(_path(store_dir, "state.json"), 'r') as f: state = json.load(f)
+    except (OSError, ValueError):
+        state = None
+    if not state or state.get("version") != STATE_VERSION or state.get("params") != _params():
+        return {"version": STATE_VERSION, "params": _params(), "files": {}}
+    return state
+
+def _save_state(state, store_dir):
+    path = _path(store_dir, "state.json")
+    with open(path + ".tmp", 'w') as f: json.dump(state, f)
+    os.replace(path + ".tmp", path)
+
+def update(data_dir=DATA_DIR, store_dir=history_store.STORE_DIR):
+    """
+    按 manifest 对比上次处理过的文件 (日期 -> sha1)：只在末尾追加了新日期时增量打分，
+    历史文件被替换/删除时该类全量重算。返回 {kind: 本次新增的异常条数}。
+    """
+    manifest = history_store.load_manifest(store_dir)
+    state = _load_state(store_dir)
+    os.makedirs(_path(store_dir, ""), exist_ok=True)
+    result = {}
+    for kind in history_store.KINDS:
+        files = {e['date']: e['sha1'] for e in manifest['files'].values() if e['kind'] == kind and e.get('segment')}
+        old = state['files'].get(kind)
+        out = _path(store_dir, "career.parquet" if kind == "meta" else f"{kind}.parquet")
+        if old == files and os.path.exists(out): continue
+        new_dates = set(files) - set(old or {})
+        appended = (old is not None and os.path.exists(out) and all(files.get(d) == s for d, s in old.items())
+                    and (not old or not new_dates or min(new_dates) > max(old)))
+        if kind == "meta":
+            # 生涯序列同样只处理新增的上传: 从上次保存的窗口和最后一次上传接着算
+            prev = state.get('career') if appended and old else None
+            if prev is not None and prev.get('date') != max(old): prev = None
+            meta = history_store.load_range("meta", prev['date'] if prev else None, None, data_dir, store_dir)
+            if prev is not None: meta = meta[meta['Date'] > prev['date']]
+            series, state['career'] = _career(meta, prev)
+            result[kind] = int((series['Outlier'] | series['Invalid']).sum())
+            if prev is not None: series = pd.concat([pd.read_parquet(out), series], ignore_index=True)
+            series.to_parquet(out, index=False)
+        else:
+            compact = history_store.compact_history(kind, data_dir, store_dir)
+            start = len(old) if appended else 0
+            flags = item_flags(compact, start)
+            result[kind] = len(flags)
+            if appended: flags = pd.concat([pd.read_parquet(out), flags], ignore_index=True)
+            flags.to_parquet(out, index=False)
+        state['files'][kind] = files
+        _save_state(state, store_dir)
+    return result
+
+def _load(kind, data_dir, store_dir):
+    """读取持久化结果 (按该类文件指纹缓存)；结果缺失或过期时先增量更新"""
+    fp = history_store.fingerprint(kind, data_dir, store_dir)
+    cached = _CACHE.get(("anomalies", store_dir, kind), fp)
+    if cached is not None: return cached
+    update(data_dir, store_dir)
+    path = _path(store_dir, "career.parquet" if kind == "meta" else f"{kind}.parquet")
+    return _CACHE.put(("anomalies", store_dir, kind), fp, pd.read_parquet(path))
+
+def career_history(data_dir=DATA_DIR, store_dir=history_store.STORE_DIR):
+    """生涯日增趋势: DataFrame[Date, Daily, Estimated, Outlier]，断档已均摊，Invalid 的日期已剔除"""
+    series = _load("meta", data_dir, store_dir)
+    hist = series.loc[~series['Invalid'], ['Date', 'Daily', 'Estimated', 'Outlier']]
+    return hist.reset_index(drop=True)
+
+def flags(kind, data_dir=DATA_DIR, store_dir=history_store.STORE_DIR):
+    """songs / albums 的全部异常记录"""
+    return _load(kind, data_dir, store_dir)
+
+def item_anomalies(item_name, is_album=False, data_dir=DATA_DIR, store_dir=history_store.STORE_DIR):
+    """单个条目的异常记录: DataFrame[Date, Daily, Median, Z]；单曲包含同一身份的旧写法 (song_index)"""
+    df = flags("albums" if is_album else "songs", data_dir, store_dir)
+    names = [item_name] if is_album else song_index.members(item_name, data_dir, store_dir)
+    return df.loc[df['Name'].isin(names), ['Date', 'Daily', 'Median', 'Z']].sort_values('Date', kind='stable').reset_index(drop=True)
+
+def latest_anomalies(kind="songs", data_dir=DATA_DIR, store_dir=history_store.STORE_DIR):
+    """最新上传日被标记的条目，按 z 分数从高到低"""
+    df = flags(kind, data_dir, store_dir)
+    dates = history_store.compact_history(kind, data_dir, store_dir)['dates']
+    if df.empty or not len(dates): return df.iloc[0:0]
+    latest = np.datetime_as_string(dates[-1], unit='D')
+    return df[df['Date'] == latest].sort_values('Z', ascending=False).reset_index(drop=True)
+
+if __name__ == "__main__":
+    history_store.ingest()
+    print(update())
+    print(latest_anomalies())
@@ -0,0 +1,257 @@
+"""
+只读 JSON/HTTP 接口：与看板共用 dashboard_service (跨会话只读状态) / history_store / milestones 的加载函数，供机器人和其他看板调用。
+标准库 ThreadingHTTPServer 实现，每个请求一个线程；ETag 由 (艺人, 数据日期, 仓库 generation, 改名覆盖文件指纹) 组成，
+客户端带 If-None-Match 且数据未更新时返回 304。
+
+    python api.py --port 8502
+    curl -i localhost:8502/api/snapshot
+    curl localhost:8502/api/top?kind=songs&by=total&n=5
+    curl "localhost:8502/api/history?item=7%20rings"
+    curl "localhost:8502/api/search?q=dont%20call"
+    curl localhost:8502/api/projections?kind=albums&tiers=1000000000,2000000000
+    curl localhost:8502/api/forecast?kind=songs&tiers=3&n=20
+
+路由 (都支持 artist=<key>，默认为默认艺人):
+  /api/health  /api/artists  /api/snapshot  /api/top  /api/history  /api/career  /api/listeners  /api/projections  /api/forecast  /api/search
+"""
+import json
+import math
+import argparse
+import urllib.parse
+from collections.abc import Mapping
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import numpy as np
+import pandas as pd
+
+import artists
+import dashboard_service
+import history_store
+import milestones
+import forecast
+import rolling_stats
+import song_index
+
+DEFAULT_TOP_N = 10
+MAX_TOP_N = 500
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+def _snapshot(key):
+    """与看板共用 dashboard_service 的只读状态，并发请求不会重复构建；未注册的 artist 返回 404 (不回落到默认艺人)"""
+    if key is not None and key not in artists.keys(): raise ApiError(404, f"unknown artist {key}")
+    artist = artists.get(key)
+    snap = dashboard_service.get(artist["key"])
+    if snap is None: raise ApiError(404, f"no data for artist {artist['key']}")
+    return artist, snap
+
+def _records(df, columns=None):
+    """DataFrame -> JSON 友好的 list[dict] (NaN 为 null)"""
+    if df is None: return []
+    if columns is not None: df = df[[c for c in columns if c in df.columns]]
+    return df.astype(object).where(df.notna(), None).to_dict('records')
+
+def _clean(value):
+    """递归转换为 JSON 原生类型：numpy 标量转 Python，NaN/inf 转 null，日期转 YYYY-MM-DD"""
+    if isinstance(value, Mapping): return {str(k): _clean(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)): return [_clean(v) for v in value]
+    if isinstance(value, pd.DataFrame): return _clean(_records(value))
+    if isinstance(value, (bool, np.bool_)): return bool(value)
+    if isinstance(value, np.integer): return int(value)
+    if isinstance(value, (float, np.floating)): return float(value) if math.isfinite(value) else None
+    if isinstance(value, (pd.Timestamp, np.datetime64)): return None if pd.isna(value) else str(pd.Timestamp(value).date())
+    if value is pd.NA: return None
+    return value
+
+def _param(query, name, default=None):
+    return query.get(name, [default])[0]
+
+def _int_param(query, name, default, lo=None, hi=None):
+    """整数参数 (接受 1e3 这样的写法)；不是整数或超出 [lo, hi] 时返回 400，不做截断"""
+    raw = _param(query, name)
+    if raw is None: return default
+    try: value = float(raw)
+    except ValueError: raise ApiError(400, f"{name} must be an integer")
+    if not value.is_integer(): raise ApiError(400, f"{name} must be an integer")
+    value = int(value)
+    if (lo is not None and value < lo) or (hi is not None and value > hi):
+        bounds = f"between {lo} and {hi}" if lo is not None and hi is not None else f">= {lo}" if lo is not None else f"<= {hi}"
+        raise ApiError(400, f"{name} must be {bounds}")
+    return value
+
+def _kind(query):
+    kind = _param(query, "kind", "songs")
+    if kind not in ("songs", "albums"): raise ApiError(400, "kind must be songs or albums")
+    return kind
+
+# --- 路由 ---
+def route_snapshot(query, artist, snap):
+    n = _int_param(query, "n", DEFAULT_TOP_N, 1, MAX_TOP_N)
+    return {
+        "artist": artist["key"], "data_date": snap["data_date"], "built_at": snap["built_at"],
+        "summary": snap["summary"], "meta": snap["meta"],
+        "top_song_daily": snap["top_song_daily"], "top_song_total": snap["top_song_total"],
+        "songs_top_daily": _records(snap["songs_top_daily"].head(n), ['Song', 'Daily_Num', 'Change', 'Change_7', 'Share']),
+        "crystal_ball": snap["crystal_ball"],
+    }
+
+def route_top(query, artist, snap):
+    kind, by = _kind(query), _param(query, "by", "daily")
+    if by not in ("daily", "total"): raise ApiError(400, "by must be daily or total")
+    n = _int_param(query, "n", DEFAULT_TOP_N, 1, MAX_TOP_N)
+    if kind == "songs":
+        df = snap["songs"].sort_values('Daily_Num' if by == "daily" else 'Streams_Num', ascending=False, kind='stable')
+        columns = ['Song', 'Daily_Num', 'Streams_Num', 'Change', 'Change_7', 'Share', 'Avg_7Days', 'Next_Milestone']
+    else:
+        if snap["albums"] is None: return {"data_date": snap["data_date"], "items": []}
+        df = snap["albums"].sort_values('Daily_Num' if by == "daily" else 'Total_Num', ascending=False, kind='stable')
+        columns = ['Base_Name', 'Daily_Num', 'Total_Num', 'Change', 'Change_7', 'Daily_Share', 'Total_Share']
+    return {"data_date": snap["data_date"], "kind": kind, "by": by, "items": _records(df.head(n), columns)}
+
+def route_history(query, artist, snap):
+    item = _param(query, "item")
+    if not item: raise ApiError(400, "item is required")
+    kind = _kind(query)
+    if kind == "songs":
+        # 旧名/乱码/错字都解析到当前写法
+        item = song_index.resolve(item, artist["data_dir"], artist["store_dir"], fuzzy=True) or item
+    hist = history_store.item_history(item, kind == "albums", artist["data_dir"], artist["store_dir"])
+    if hist.empty: raise ApiError(404, f"no history for {item!r}")
+    return {"data_date": snap["data_date"], "item": item, "kind": kind, "history": _records(hist)}
+
+def route_search(query, artist, snap):
+    """单曲名称的输入即搜 (song_index)；返回规范名及其全部历史写法"""
+    q = _param(query, "q", "")
+    n = _int_param(query, "n", song_index.SEARCH_LIMIT, 1, MAX_TOP_N)
+    names = song_index.search(q, n, artist["data_dir"], artist["store_dir"])
+    return {"data_date": snap["data_date"], "q": q, "items": [
+        {"Song": name, "Aliases": song_index.members(name, artist["data_dir"], artist["store_dir"])[1:]} for name in names]}
+
+def route_career(query, artist, snap):
+    return {"data_date": snap["data_date"], "history": _records(snap["career_history"])}
+
+def route_listeners(query, artist, snap):
+    return {"data_date": snap["data_date"], "history": _records(snap["listeners_history"])}
+
+def route_projections(query, artist, snap):
+    """
+    所有单曲/专辑按 7 日均速常数投影到下一个档位，ETA 从数据日期起算；tiers=逗号分隔的阈值，step=固定步长 (默认 100M / 1B)。
+    专辑速度为 7 日正值均速，数据不足时用当日日增。水晶球的速度、ETA 与区间来自衰减/星期模型，见 /api/forecast。
+    """
+    kind = _kind(query)
+    if kind == "songs":
+        df, name, total, step = snap["songs"], 'Song', 'Streams_Num', milestones.MILESTONE_100M
+        speed = df['Avg_7Days']
+    else:
+        df, name, total, step = snap["albums"], 'Base_Name', 'Total_Num', milestones.MILESTONE_1B
+        if df is None: return {"data_date": snap["data_date"], "items": []}
+        speed = df['Base_Name'].map(rolling_stats.album_averages(7, artist["data_dir"], artist["store_dir"])).fillna(0)
+        speed = speed.where(speed != 0, df['Daily_Num'])
+    tiers = _param(query, "tiers")
+    try: thresholds = [int(float(t)) for t in tiers.split(",") if t.strip()] if tiers else None
+    except ValueError: raise ApiError(400, "tiers must be comma-separated integers")
+    step = _int_param(query, "step", step, 1)
+    proj = milestones.project_milestones(df[total], speed, step=step, thresholds=thresholds,
+                                         now=snap["data_date"], index=df.index)
+    proj.insert(0, "Name", df[name])
+    proj = proj.drop(columns=['ETA']).sort_values('Days', kind='stable')
+    proj['Days'] = proj['Days'].where(np.isfinite(proj['Days']))
+    n = _int_param(query, "n", MAX_TOP_N, 1, MAX_TOP_N)
+    return {"data_date": snap["data_date"], "kind": kind, "items": _records(proj.head(n))}
+
+def _thresholds(query):
+    tiers = _param(query, "thresholds")
+    try: return [int(float(t)) for t in tiers.split(",") if t.strip()] if tiers else None
+    except ValueError: raise ApiError(400, "thresholds must be comma-separated integers")
+
+def route_forecast(query, artist, snap):
+    """衰减/星期模型的里程碑 ETA 区间；tiers=每个条目的档位数，step=步长，thresholds=逗号分隔的阈值"""
+    kind = _kind(query)
+    step = _int_param(query, "step", None, 1)
+    n_tiers = _int_param(query, "tiers", 1, 1, 10)
+    confidence = _param(query, "confidence")
+    try: confidence = forecast.CONFIDENCE if confidence is None else float(confidence)
+    except ValueError: raise ApiError(400, "confidence must be a number")
+    if not 0.01 <= confidence <= 0.99: raise ApiError(400, "confidence must be between 0.01 and 0.99")
+    fc = forecast.milestone_forecast(kind, step=step, thresholds=_thresholds(query), n_tiers=n_tiers, confidence=confidence,
+                                     data_dir=artist["data_dir"], store_dir=artist["store_dir"])
+    fc = fc.sort_values('Days', kind='stable')
+    for col in ('Days', 'Days_Lo', 'Days_Hi'): fc[col] = fc[col].where(np.isfinite(fc[col]))
+    n = _int_param(query, "n", MAX_TOP_N, 1, MAX_TOP_N)
+    return {"data_date": snap["data_date"], "kind": kind, "confidence": confidence, "items": _records(fc.head(n))}
+
+ROUTES = {
+    "/api/snapshot": route_snapshot,
+    "/api/top": route_top,
+    "/api/history": route_history,
+    "/api/career": route_career,
+    "/api/listeners": route_listeners,
+    "/api/projections": route_projections,
+    "/api/forecast": route_forecast,
+    "/api/search": route_search,
+}
+
+class Handler(BaseHTTPRequestHandler):
+    server_version = "AriStatsAPI/1.0"
+    protocol_version = "HTTP/1.1"
+
+    def _send(self, status, body=None, etag=None):
+        payload = b"" if body is None else json.dumps(_clean(body), ensure_ascii=False).encode()
+        self.send_response(status)
+        if etag:
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", "no-cache")
+        if body is not None: self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        if payload and self.command != "HEAD": self.wfile.write(payload)
+
+    def do_GET(self):
+        url = urllib.parse.urlsplit(self.path)
+        query = urllib.parse.parse_qs(url.query)
+        path = url.path.rstrip("/") or "/"
+        try:
+            if path == "/api/health": return self._send(200, {"status": "ok"})
+            if path == "/api/artists":
+                return self._send(200, [{"key": a["key"], "name": a["name"]} for a in artists.all_artists()])
+            handler = ROUTES.get(path)
+            if handler is None: raise ApiError(404, f"unknown endpoint {path}")
+            artist, snap = _snapshot(_param(query, "artist"))
+            # 同一数据日期内 generation 变化 (例如补传/替换文件) 或改名覆盖文件 (song_index) 变化也会更新 ETag
+            etag = f'"{artist["key"]}-{snap["data_date"]}-{snap["generation"]}-{snap["aliases"]}"'
+            if etag in [t.strip() for t in self.headers.get("If-None-Match", "").split(",")]:
+                return self._send(304, etag=etag)
+            return self._send(200, handler(query, artist, snap), etag=etag)
+        except ApiError as e:
+            return self._send(e.status, {"error": str(e)})
+        except Exception as e:
+            return self._send(500, {"error": f"{type(e).__name__}: {e}"})
+
+    do_HEAD = do_GET
+
+    def log_message(self, format, *args):
+        if self.server.verbose: super().log_message(format, *args)
+
+def make_server(host="127.0.0.1", port=8502, verbose=False):
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    server.verbose = verbose
+    return server
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the tracker's numbers as a read-only JSON API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8502)
+    parser.add_argument("--quiet", action="store_true")
+    args = parser.parse_args(argv)
+    server = make_server(args.host, args.port, verbose=not args.quiet)
+    print(f"Serving on http://{args.host}:{server.server_address[1]}/api/snapshot")
+    try: server.serve_forever()
+    except KeyboardInterrupt: pass
+    finally: server.server_close()
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,111 @@
+"""
+月度归档：把已结束月份的原始每日文件原样打包为 <data_dir>/archive/YYYY-MM.zip，目录里只留当月的上传。
+archive/manifest.json 记录每个归档包含的文件及其原始 (mtime, size, sha1)：
+  - data_utils.list_daily_files 把归档成员列为虚拟路径 (archive/YYYY-MM.zip/<文件名>)，按日期范围只看相关月份
+  - history_store 用清单里的原始值比对，打包前已摄入的文件不会被重新解析
+"已结束" 指早于最新一次上传所在月份的月份。某月归档后又补传了文件，再次运行会并入该月的归档
+(同名文件以新上传的为准)。每个归档写完后逐个核对 sha1，清单落盘之后才删除原始文件。
+
+    python archive.py --dry-run
+    python archive.py
+"""
+import os
+import re
+import json
+import time
+import hashlib
+import zipfile
+
+from data_utils import (
+    DATA_DIR, ARCHIVE_DIR, ARCHIVE_MANIFEST, FILE_SUFFIX, archive_manifest, date_of, open_daily,
+)
+
+COMPRESS_LEVEL = 9
+
+_DATE_RE = re.compile(r"\d{4}-\d{2}-\d{2}$")
+
+def _path(data_dir, name=""):
+    return os.path.join(data_dir, ARCHIVE_DIR, name)
+
+def _sha1(data):
+    return hashlib.sha1(data).hexdigest()
+
+def raw_files(data_dir=DATA_DIR):
+    """目录里的原始每日文件 {月份: [文件名]}；文件名不以 YYYY-MM-DD 开头的不参与归档"""
+    months = {}
+    for name in sorted(os.listdir(data_dir)) if os.path.isdir(data_dir) else []:
+        if not name.endswith(tuple(FILE_SUFFIX.values())) or not _DATE_RE.match(date_of(name)): continue
+        months.setdefault(name[:7], []).append(name)
+    return months
+
+def closed_months(data_dir=DATA_DIR):
+    """有原始文件待归档的已结束月份 {月份: [文件名]}"""
+    raw = raw_files(data_dir)
+    latest = max([*raw, *archive_manifest(data_dir)['months']], default=None)
+    return {month: names for month, names in raw.items() if month < latest}
+
+def _save_manifest(manifest, data_dir):
+    tmp = _path(data_dir, ARCHIVE_MANIFEST + ".tmp")
+    with open(tmp, 'w', encoding='utf-8') as f: json.dump(manifest, f, ensure_ascii=False, indent=1)
+    os.replace(tmp, _path(data_dir, ARCHIVE_MANIFEST))
+
+def _archive_month(month, names, manifest, data_dir):
+    """把 names 并入 month 的归档 (先写临时文件、核对后替换)，返回该月的清单条目"""
+    old = manifest['months'].get(month, {"file": f"{month}.zip", "files": {}})
+    zip_path = _path(data_dir, old['file'])
+    files, contents = {}, {}
+    for name in names:
+        path = os.path.join(data_dir, name)
+        st_ = os.stat(path)
+        with open(path, 'rb') as f: contents[name] = f.read()
+        files[name] = {"mtime": st_.st_mtime, "size": st_.st_size, "sha1": _sha1(contents[name])}
+    tmp = zip_path + ".tmp"
+    with zipfile.ZipFile(tmp, 'w', zipfile.ZIP_DEFLATED, compresslevel=COMPRESS_LEVEL) as out:
+        # 旧归档里没有被新上传替换的成员原样拷贝
+        for name, info in old['files'].items():
+            if name in files: continue
+            with open_daily(os.path.join(zip_path, name)) as f: contents[name] = f.read()
+            files[name] = info
+        for name in sorted(files):
+            mtime = time.localtime(files[name]['mtime'])[:6]
+            out.writestr(zipfile.ZipInfo(name, date_time=max(mtime, (1980, 1, 1, 0, 0, 0))), contents[name],
+                         compress_type=zipfile.ZIP_DEFLATED, compresslevel=COMPRESS_LEVEL)
+    with zipfile.ZipFile(tmp) as check:
+        bad = [name for name in files if _sha1(check.read(name)) != files[name]['sha1']]
+    if bad:
+        os.remove(tmp)
+        raise RuntimeError(f"archive {month}: checksum mismatch for {', '.join(bad)}")
+    os.replace(tmp, zip_path)
+    dates = sorted(date_of(name) for name in files)
+    return {"file": old['file'], "first": dates[0], "last": dates[-1], "bytes": os.path.getsize(zip_path),
+            "files": dict(sorted(files.items()))}
+
+def archive(data_dir=DATA_DIR, dry_run=False):
+    """
+    归档所有已结束月份的原始文件，返回 {月份: 归档的文件数}。
+    每个月: 写 zip -> 核对 -> 更新清单 -> 删除原始文件；中途失败时原始文件仍在，优先于归档中的同名文件。
+    """
+    pending = closed_months(data_dir)
+    if dry_run or not pending: return {month: len(names) for month, names in pending.items()}
+    os.makedirs(_path(data_dir), exist_ok=True)
+    manifest = json.loads(json.dumps(archive_manifest(data_dir)))
+    for month, names in sorted(pending.items()):
+        manifest['months'][month] = _archive_month(month, names, manifest, data_dir)
+        manifest['months'] = dict(sorted(manifest['months'].items()))
+        _save_manifest(manifest, data_dir)
+        for name in names: os.remove(os.path.join(data_dir, name))
+    return {month: len(names) for month, names in pending.items()}
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Pack raw daily files of closed months into monthly zip archives.")
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--dry-run", action="store_true", help="only list the months that would be archived")
+    args = parser.parse_args()
+    done = archive(args.data_dir, args.dry_run)
+    if not done: print("nothing to archive")
+    for month, n in sorted(done.items()): print(f"{month}: {n} files" + (" (dry run)" if args.dry_run else ""))
+    if done and not args.dry_run:
+        months = archive_manifest(args.data_dir)['months']
+        print(f"{sum(len(m['files']) for m in months.values())} files in {len(months)} archives, "
+              f"{sum(m['bytes'] for m in months.values()) / 2**20:.2f} MB")
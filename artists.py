@@ -0,0 +1,155 @@
+"""
+艺人注册表：每位艺人的数据目录、历史仓库目录、水晶球专辑、Spotify 链接、主题配色与图片。
+数据层 (history_store / rolling_stats / milestones / snapshot) 只接收 data_dir / store_dir / albums_map，
+页面按所选艺人取配置；所有艺人共用 memcache.SHARED 这一个有界缓存，且只在被查看时才摄入。
+
+默认注册 Ariana Grande (沿用 daily_data 与 .history_store)。更多艺人写在 artists.json
+(或 ARI_ARTISTS_FILE 指定的文件) 中，格式为 {key: {配置字段...}}，未写的字段取默认值:
+
+    {"synthetic-artist-1": {"name": "Synthetic Artist 1", "data_dir": "/tmp/synth/synthetic_artist_1"}}
+"""
+import os
+import json
+import warnings
+import urllib.parse
+
+import history_store
+from data_utils import DATA_DIR
+
+ARTISTS_FILE = os.environ.get("ARI_ARTISTS_FILE", "artists.json")
+DEFAULT_ARTIST = "ariana-grande"
+
+# 新艺人未指定主题时使用的配色
+DEFAULT_THEMES = {"Classic": ("#1DB954", "#B3F5C9")}
+
+ARIANA = {
+    "name": "Ariana Grande",
+    "data_dir": DATA_DIR,
+    "store_dir": history_store.STORE_DIR,
+    # 水晶球追踪的专辑: 显示名 -> Base_Name
+    "albums_map": {
+        "Yours Truly": "Yours Truly",
+        "My Everything": "My Everything",
+        "Dangerous Woman": "Dangerous Woman",
+        "Sweetener": "Sweetener",
+        "thank u, next": "thank u, next",
+        "Positions": "Positions",
+        "eternal sunshine (deluxe)": "eternal sunshine deluxe: brighter days ahead"
+    },
+    # Spotify 搜索前缀 (f"{spotify_query} {song}")
+    "spotify_query": "Ariana Grande",
+    "spotify_url": "https://open.spotify.com/artist/66CXWjxzNUsdJxJ2JdwvnR",
+    "hits_pool": {
+        "eternal sunshine": ["we can't be friends", "yes, and?", "the boy is mine", "intro (end of the world)"],
+        "Positions": ["positions", "34+35", "pov", "motive"],
+        "thank u, next": ["7 rings", "thank u, next", "break up with your girlfriend", "needy"],
+        "Sweetener": ["no tears left to cry", "god is a woman", "breathin", "R.E.M"],
+        "Dangerous Woman": ["Side To Side", "Into You", "Dangerous Woman", "Be Alright"],
+        "My Everything": ["One Last Time", "Bang Bang", "Problem", "Break Free"],
+        "Yours Truly": ["The Way", "Honeymoon Avenue", "Baby I", "Tattooed Heart"],
+        "Yours Truly (Tenth Anniversary Edition)": ["The Way - Live from London", "Tattooed Heart - Live from London"]
+    },
+    "themes": {
+        "Elphaba Green": ("#2E8B57", "#98FB98"),
+        "Glinda Pink": ("#FF1493", "#FFB6C1"),
+        "Wicked Mix": ("#FF69B4", "#50C878"),
+        "Eternal Sunshine": ("#722F37", "#A52A2A"),
+        "Brighter Days": ("#1E90FF", "#87CEEB"),
+        "Dangerous Woman": ("#333333", "#9370DB"),
+        "Sweetener": ("#A0A0A0", "#F5F5DC"),
+        "Positions": ("#696969", "#D3D3D3"),
+        "Thank u, next": ("#000000", "#FFC0CB"),
+        "My Everything": ("#9400D3", "#EE82EE"),
+        "Yours Truly": ("#4682B4", "#ADD8E6")
+    },
+    "theme_images": {
+        "Elphaba Green": "WICKED.jpg", "Glinda Pink": "WICKED.jpg", "Wicked Mix": "WICKED.jpg",
+        "Eternal Sunshine": "ETERNALSUNSHINE.jpg", "Brighter Days": "BRIGHTERDAYSAHEAD.jpg",
+        "Dangerous Woman": "DANGEROUSWOMAN.jpg", "Sweetener": "SWEETENER.jpg",
+        "Positions": "POSITIONS.jpg", "Thank u, next": "THANKUNEXT.jpg",
+        "My Everything": "MYEVERYTHING.jpg", "Yours Truly": "YOURSTRULY.jpg"
+    },
+    "portrait": "ARIANA.jpg",
+    "logo": "ARIANAlogo.png",
+    "youtube_videos": ["SXiSVQZLje8", "QYh6mYIJG2Y", "iS1g8G_njx8", "ffxKSjUwKdU", "nlR0MkrRklg", "pE49WK-oNjU", "KNtJGQkC-WI", "B6_iQvaIjXw", "EEhZAHZQyf4", "kHLHSlExFis", "BPgEgaPk62M", "tcYodQoapMg", "gl1aHhXnN1k", "1ekZEVeXwek", "yj1Kvhog6PU", "KwRxeZ9Ro24", "eB6txyhHFG4"],
+    "website": "https://www.arianagrande.com/",
+    "instagram": "https://www.instagram.com/arianagrande/",
+}
+
+_REGISTRY = {}
+
+def _defaults(key, name):
+    return {
+        "name": name,
+        "data_dir": os.path.join(DATA_DIR, key),
+        # 其他艺人的仓库放在 .history_store/artists/<key>/，与默认艺人的分段互不干扰
+        "store_dir": os.path.join(history_store.STORE_DIR, "artists", key),
+        "albums_map": {},
+        "spotify_query": name,
+        "spotify_url": f"https://open.spotify.com/search/{urllib.parse.quote(name)}",
+        "hits_pool": {},
+        "themes": DEFAULT_THEMES,
+        "theme_images": {},
+        "portrait": None,
+        "logo": None,
+        "youtube_videos": [],
+        "website": None,
+        "instagram": None,
+    }
+
+def _validate(key, config):
+    """检查一条配置: 字段名必须是已知字段，类型与默认值一致 (图片/链接可为 null)；不合格时抛 TypeError/ValueError"""
+    if not isinstance(key, str) or not key: raise ValueError(f"artist key must be a non-empty string: {key!r}")
+    defaults = _defaults(key, key)
+    unknown = sorted(set(config) - set(defaults))
+    if unknown: raise ValueError(f"artist {key}: unknown fields {', '.join(unknown)}")
+    for field, value in config.items():
+        default = defaults[field]
+        expected = (str, type(None)) if default is None else dict if isinstance(default, dict) else list if isinstance(default, list) else str
+        if not isinstance(value, expected): raise TypeError(f"artist {key}: {field} must be {getattr(expected, '__name__', 'str or null')}")
+    for theme, colors in config.get("themes", {}).items():
+        if not isinstance(colors, (list, tuple)) or len(colors) != 2 or not all(isinstance(c, str) for c in colors):
+            raise TypeError(f"artist {key}: theme {theme} must be [primary, secondary] colors")
+
+def register(key, **config):
+    """注册 (或覆盖) 一位艺人，未给出的字段取默认值；配置不合格时抛 TypeError/ValueError，不注册。返回完整配置"""
+    _validate(key, config)
+    artist = _defaults(key, config.get("name", key))
+    artist.update(config)
+    artist["key"] = key
+    artist["themes"] = {k: tuple(v) for k, v in artist["themes"].items()}
+    _REGISTRY[key] = artist
+    return artist
+
+def load_registry(path=ARTISTS_FILE):
+    """
+    从 JSON 文件注册更多艺人，返回注册成功的 key；文件不存在时只有默认艺人。
+    文件本身读不了或不是对象时抛 OSError/ValueError；单条配置不合格时发出警告并跳过该条，其余照常注册
+    """
+    if not path or not os.path.exists(path): return []
+    with open(path, 'r', encoding='utf-8') as f: entries = json.load(f)
+    if not isinstance(entries, dict): raise ValueError("expected an object of {key: config}")
+    loaded = []
+    for key, config in entries.items():
+        try:
+            if not isinstance(config, dict): raise TypeError(f"artist {key}: config must be an object")
+            register(key, **config)
+            loaded.append(key)
+        except (TypeError, ValueError) as e:
+            warnings.warn(f"artists: skipped an entry in {path}: {e}", RuntimeWarning)
+    return loaded
+
+def get(key=None):
+    """按 key 取艺人配置，未知 key 回落到默认艺人"""
+    return _REGISTRY.get(key) or _REGISTRY[DEFAULT_ARTIST]
+
+def keys():
+    return list(_REGISTRY)
+
+def all_artists():
+    return list(_REGISTRY.values())
+
+register(DEFAULT_ARTIST, **ARIANA)
+# 注册表损坏时仍可用默认艺人打开看板，但必须发出警告 (服务器日志可见)，不能静默跳过
+try: load_registry()
+except (OSError, ValueError) as e: warnings.warn(f"artists: failed to load {ARTISTS_FILE}: {e}", RuntimeWarning)
@@ -0,0 +1,165 @@
+"""
+静态资源管线：主题图片缩放/重新压缩为缩略图，logo 预编码为 data URI，每个主题的 CSS 只渲染一次。
+结果按 (文件名, mtime, size, 参数) 落盘到 <STORE_DIR>/assets/，并在进程内 memoize，
+rerun 时不再重新读取、编码原图或拼接 CSS。
+
+构建期预生成 (可选): python assets.py
+"""
+import os
+import io
+import base64
+import hashlib
+from functools import lru_cache
+
+import artists
+import history_store
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow 随 streamlit 安装；缺失时直接使用原图
+    Image = None
+
+ASSET_DIR = os.path.join(history_store.STORE_DIR, "assets")
+# 侧边栏约 300px 宽，按 2 倍像素密度生成
+THUMB_WIDTH = 600
+JPEG_QUALITY = 80
+
+# 全局样式模板 (str.format；字面量花括号写作 {{ }})
+CSS_TEMPLATE = """<style>
+    /* 全局字体 */
+    .stApp, p, h1, h2, h3, h4, h5, h6, .stMarkdown, .stDataFrame, .stMetric, button, input, a {{
+        font-family: 'Times New Roman', Times, serif !important;
+    }}
+    /* Metric 数字、标签字体强制修正 */
+    div[data-testid="stMetricValue"], div[data-testid="stMetricDelta"], div[data-testid="stMetricLabel"] {{
+        font-family: 'Times New Roman', Times, serif !important;
+    }}
+    i, .material-icons, [data-testid="stExpanderToggleIcon"] {{
+        font-family: "Source Sans Pro", sans-serif !important;
+    }}
+    /* 背景渐变 */
+    .stApp {{ background: linear-gradient(to bottom, {secondary_color}25, #ffffff); background-attachment: fixed; }}
+    /* 标题颜色 */
+    h1, h2, h3, h4 {{ color: {primary_color} !important; text-shadow: 1px 1px 2px rgba(255,255,255,0.8); }}
+     
+    /* Metric 卡片样式 */
+    div[data-testid="stMetric"] {{
+        background: rgba(255, 255, 255, 0.8);
+        border: 1px solid {primary_color}40;
+        border-left: 5px solid {primary_color};
+        border-radius: 12px; 
+        padding: 15px 10px;
+        box-shadow: 0 4px 15px rgba(0,0,0,0.05);
+        backdrop-filter: blur(10px);
+        transition: transform 0.3s ease, box-shadow 0.3s ease;
+        height: 100%;
+        font-family: 'Times New Roman', Times, serif !important;
+    }}
+    div[data-testid="stMetric"]:hover {{
+        transform: translateY(-3px);
+        box-shadow: 0 8px 25px rgba(0,0,0,0.1);
+    }}
+     
+    /* Big Stat Banner */
+    .big-stat {{
+        background: linear-gradient(to right, rgba(255,255,255,0.95), {secondary_color}30, rgba(255,255,255,0.95));
+        border: 2px solid {primary_color}; color: {primary_color};
+        font-size: 42px; font-weight: bold; text-align: center;
+        padding: 25px; border-radius: 25px; margin-bottom: 25px;
+        backdrop-filter: blur(10px);
+        box-shadow: 0 10px 30px rgba(0,0,0,0.08);
+        font-family: 'Times New Roman', Times, serif !important;
+    }}
+    .sub-stat {{ font-size: 18px; color: #555; display: block; margin-top: 5px; font-family: 'Times New Roman', serif !important; }}
+    .date-stat {{ font-size: 14px; color: #888; display: block; margin-top: 15px; font-weight: normal; font-family: 'Times New Roman', serif !important; }}
+     
+    .spotify-card {{
+        background: white; border: 1px solid {primary_color}; border-radius: 8px;
+        padding: 10px; text-align: center; text-decoration: none; color: #333;
+        display: block; transition: 0.3s; margin-bottom: 10px;
+        font-family: 'Times New Roman', serif !important;
+    }}
+    .spotify-card:hover {{ background: {secondary_color}40; transform: translateY(-2px); }}
+     
+    .media-btn {{
+        display: inline-block; padding: 10px 20px; margin: 5px;
+        border-radius: 20px; text-decoration: none; color: white; font-weight: bold;
+        transition: 0.3s; border: none;
+        font-family: 'Times New Roman', serif !important;
+    }}
+    .media-btn:hover {{ opacity: 0.9; transform: scale(1.05); box-shadow: 0 5px 15px rgba(0,0,0,0.2); }}
+    .footer {{
+        margin-top: 20px; padding: 20px; background-color: rgba(255,255,255,0.6);
+        border-top: 1px solid {primary_color}; text-align: center; color: #555; border-radius: 10px;
+        font-family: 'Times New Roman', serif !important;
+    }}
+    img {{ border-radius: 15px; border: 3px solid {primary_color}; margin-bottom: 15px; }}
+</style>
+"""
+
+def _cache_path(path, suffix, *params):
+    st_ = os.stat(path)
+    key = f"{os.path.abspath(path)}|{st_.st_mtime_ns}|{st_.st_size}|{params}"
+    name = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(ASSET_DIR, f"{name}-{hashlib.sha1(key.encode()).hexdigest()[:12]}{suffix}")
+
+def _resize(path, width, fmt):
+    """缩放到不超过 width 像素宽并重新压缩，返回字节；结果大于原图时返回原图"""
+    with open(path, "rb") as f: original = f.read()
+    if Image is None: return original
+    with Image.open(io.BytesIO(original)) as im:
+        if im.width > width: im = im.resize((width, round(im.height * width / im.width)), Image.LANCZOS)
+        buf = io.BytesIO()
+        if fmt == "JPEG": im.convert("RGB").save(buf, "JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+        else: im.save(buf, "PNG", optimize=True)
+    data = buf.getvalue()
+    return data if len(data) < len(original) else original
+
+@lru_cache(maxsize=None)
+def _thumbnail(path, mtime_ns, size, width):
+    fmt = "PNG" if path.lower().endswith(".png") else "JPEG"
+    cached = _cache_path(path, "." + fmt.lower(), width)
+    if os.path.exists(cached):
+        with open(cached, "rb") as f: return f.read()
+    data = _resize(path, width, fmt)
+    try:
+        os.makedirs(ASSET_DIR, exist_ok=True)
+        with open(cached + ".tmp", "wb") as f: f.write(data)
+        os.replace(cached + ".tmp", cached)
+    except OSError: pass
+    return data
+
+def thumbnail(path, width=THUMB_WIDTH):
+    """缩略图字节 (st.image 可直接使用)；文件不存在时返回 None"""
+    if not path or not os.path.exists(path): return None
+    st_ = os.stat(path)
+    return _thumbnail(path, st_.st_mtime_ns, st_.st_size, width)
+
+@lru_cache(maxsize=None)
+def _data_uri(path, mtime_ns, size, width):
+    mime = "image/png" if path.lower().endswith(".png") else "image/jpeg"
+    return f"data:{mime};base64,{base64.b64encode(_thumbnail(path, mtime_ns, size, width)).decode()}"
+
+def data_uri(path, width=THUMB_WIDTH):
+    """预编码的 data URI；文件不存在时返回空字符串"""
+    if not path or not os.path.exists(path): return ""
+    st_ = os.stat(path)
+    return _data_uri(path, st_.st_mtime_ns, st_.st_size, width)
+
+@lru_cache(maxsize=256)
+def theme_css(primary_color, secondary_color):
+    return CSS_TEMPLATE.format(primary_color=primary_color, secondary_color=secondary_color)
+
+def prebuild(artist):
+    """为一位艺人生成全部主题图、头像、logo 和主题 CSS，返回生成的缩略图字节数之和"""
+    total = 0
+    for path in set(artist["theme_images"].values()) | {artist["portrait"]}:
+        data = thumbnail(path)
+        total += len(data) if data else 0
+    total += len(data_uri(artist["logo"]))
+    for primary, secondary in artist["themes"].values(): theme_css(primary, secondary)
+    return total
+
+if __name__ == "__main__":
+    for artist in artists.all_artists():
+        print(f"{artist['name']}: {prebuild(artist):,} bytes of thumbnails")
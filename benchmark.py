@@ -0,0 +1,138 @@
+"""
+数据层基准测试：无界面地运行各加载函数，报告每个函数的耗时和峰值内存。
+
+    python benchmark.py                              # 只测 daily_data
+    python benchmark.py --scales 1,3,10 --songs 1000 # 另外生成 1/3/10 年 × 1000 首的合成历史
+    python benchmark.py --json bench.json            # 结果另存 JSON，便于对比回归
+
+峰值内存用 tracemalloc 统计 (Python/NumPy 分配)，pyarrow 内存池单独列出。
+页面渲染的分段耗时见 profiling.py (ARI_PROFILE=1)。
+"""
+import os
+import gc
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import tracemalloc
+
+import export
+import history_store
+import rolling_stats
+import snapshot
+import song_index
+import synthetic_data
+from data_utils import DATA_DIR, list_daily_files, read_songs_file
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+def _cases(data_dir, store_dir):
+    """(名称, 准备函数, 被测函数)；准备函数负责制造冷/热状态"""
+    def cold_store():
+        shutil.rmtree(store_dir, ignore_errors=True)
+        history_store.clear_caches()
+        rolling_stats.clear_caches()
+
+    def cold_cache():
+        history_store.clear_caches()
+        rolling_stats.clear_caches()
+
+    def warm(): pass
+
+    latest = list_daily_files("songs", data_dir)[-1]
+    song = read_songs_file(latest)['Song'].iloc[0]
+    return [
+        ("read_songs_file (1 day)", warm, lambda: read_songs_file(latest)),
+        ("ingest (cold, all days)", cold_store, lambda: history_store.ingest(data_dir, store_dir)),
+        ("ingest (no changes)", warm, lambda: history_store.ingest(data_dir, store_dir)),
+        ("load_table songs (cold cache)", cold_cache, lambda: history_store.load_table("songs", data_dir, store_dir)),
+        ("day_table songs (cold cache, 1 day)", cold_cache,
+         lambda: history_store.day_table("songs", history_store.latest_date("songs", data_dir, store_dir), data_dir, store_dir)),
+        ("history_matrix songs (cold cache)", cold_cache, lambda: history_store.history_matrix("songs", 'Daily', data_dir, store_dir)),
+        ("item_history (warm)", warm, lambda: history_store.item_history(song, False, data_dir, store_dir)),
+        ("song_index load (cold cache)", cold_cache, lambda: song_index.load(data_dir, store_dir)),
+        ("song_index.search (warm)", warm, lambda: song_index.search(song[:6], data_dir=data_dir, store_dir=store_dir)),
+        ("career_history", warm, lambda: history_store.career_history(data_dir, store_dir)),
+        ("listeners_history", warm, lambda: history_store.listeners_history(data_dir, store_dir)),
+        ("rolling_stats songs (cold)", lambda: rolling_stats.clear_caches(),
+         lambda: rolling_stats.item_stats("songs", data_dir=data_dir, store_dir=store_dir)),
+        ("build_snapshot (cold cache)", cold_cache, lambda: snapshot.build_snapshot(data_dir, store_dir)),
+        # 摄入 (anomalies 会缓存 meta 长表) 之后紧接着构建快照，对应每次新上传后的第一次访问
+        ("build_snapshot (cold store)", cold_store, lambda: snapshot.build_snapshot(data_dir, store_dir)),
+        ("export songs parquet (all days)", warm,
+         lambda: export.export(os.path.join(tempfile.gettempdir(), "ari_bench_export.parquet"), "songs", data_dir=data_dir, store_dir=store_dir)),
+    ]
+
+def _measure(setup, fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        setup(); gc.collect()
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    setup(); gc.collect()
+    arrow_before = pa.total_allocated_bytes() if pa else 0
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    arrow_after = pa.total_allocated_bytes() if pa else 0
+    return best, peak, max(arrow_after - arrow_before, 0)
+
+def run_dataset(name, data_dir, repeat=1):
+    store_dir = tempfile.mkdtemp(prefix="ari_bench_store_")
+    try:
+        n_files = sum(len(list_daily_files(k, data_dir)) for k in history_store.KINDS)
+        rows = []
+        for case, setup, fn in _cases(data_dir, store_dir):
+            wall, peak, arrow = _measure(setup, fn, repeat)
+            rows.append({"dataset": name, "files": n_files, "case": case,
+                         "wall_ms": round(wall * 1000, 2), "peak_mb": round(peak / 2**20, 2),
+                         "arrow_mb": round(arrow / 2**20, 2)})
+            print(f"  {case:<36} {wall * 1000:>10.1f} ms {peak / 2**20:>9.1f} MB", flush=True)
+        # 常驻内存：紧凑历史 (int64 矩阵 + 名称字典 + 日期索引) 的实际占用
+        for rec in history_store.memory_report(data_dir, store_dir).to_dict('records'):
+            rows.append({"dataset": name, "files": n_files, "case": f"footprint {rec['Kind']}",
+                         "days": rec["Days"], "items": rec["Items"], "resident_mb": round(rec["Total_MB"], 2)})
+            print(f"  {'footprint ' + rec['Kind']:<36} {rec['Days']:>6} days x {rec['Items']:>6} items {rec['Total_MB']:>9.1f} MB")
+        return rows
+    finally:
+        shutil.rmtree(store_dir, ignore_errors=True)
+        history_store.clear_caches()
+        rolling_stats.clear_caches()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the tracker's data layer.")
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--scales", default="", help="comma-separated synthetic history lengths in years, e.g. 1,3,10")
+    parser.add_argument("--songs", type=int, default=1000)
+    parser.add_argument("--albums", type=int, default=30)
+    parser.add_argument("--repeat", type=int, default=1, help="timed runs per case (best is reported)")
+    parser.add_argument("--json", default=None, help="write results to this JSON file")
+    args = parser.parse_args(argv)
+
+    results = []
+    if list_daily_files("songs", args.data_dir):
+        print(f"[{args.data_dir}]")
+        results += run_dataset(args.data_dir, args.data_dir, args.repeat)
+    for years in [float(y) for y in args.scales.split(",") if y.strip()]:
+        tmp = tempfile.mkdtemp(prefix="ari_bench_data_")
+        try:
+            label = f"synthetic {years:g}y x {args.songs} songs"
+            print(f"[{label}] generating...", flush=True)
+            synthetic_data.generate_artist(tmp, years=years, n_songs=args.songs, n_albums=args.albums)
+            results += run_dataset(label, tmp, args.repeat)
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    if args.json:
+        with open(args.json, 'w') as f: json.dump(results, f, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
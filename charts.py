@@ -0,0 +1,85 @@
+"""
+plotly 图表构建与缓存：看板的每张图按 (艺人仓库, 图表, 数据日期, 主题, 条目) 缓存构建好的 Figure，
+放在 memcache.SHARED 里按字节数做 LRU 淘汰；数据目录指纹作为 generation，同一日期补传/替换文件也会失效。
+主题是从固定的 THEMES 中随机选取的，所以同主题的其他会话、重复查看同一首歌都直接复用，不再调用 px.* 与 update_layout。
+st.plotly_chart 只读取 Figure (序列化为 JSON)，多个会话共用同一对象是安全的；同一张图同时未命中时只构建一次 (单飞)。
+"""
+import plotly.express as px
+
+import memcache
+
+LAYOUT = dict(plot_bgcolor='rgba(0,0,0,0)', paper_bgcolor='rgba(0,0,0,0)', font=dict(family="Times New Roman"))
+ANOMALY_COLOR = "#E0245E"
+
+_CACHE = memcache.SHARED
+
+def color_scale(theme_name):
+    """单曲日增条形图的色阶"""
+    return "RdPu" if "Pink" in theme_name else ("Viridis" if "Green" in theme_name else "Turbo")
+
+def add_anomaly_markers(fig, points, name, symbol="x"):
+    if points.empty: return
+    fig.add_scatter(x=points['Date'], y=points['Daily'], mode='markers', name=name,
+                    marker=dict(symbol=symbol, size=11, color=ANOMALY_COLOR), showlegend=False)
+
+# --- 各图表的构建函数 (只在缓存未命中时调用) ---
+def listeners(l_hist_df, primary):
+    fig_l = px.line(l_hist_df, x='Date', y='Listeners', markers=True, title="Monthly Listeners History", height=450)
+    fig_l.update_layout(**LAYOUT, xaxis_title=None, yaxis_title=None, hovermode="x unified")
+    fig_l.update_traces(line_color=primary, line_width=3)
+    return fig_l
+
+def career(hist_df, primary):
+    # height=450 保证高度，宽度自动填充
+    fig_hist = px.line(hist_df, x='Date', y='Daily', markers=True, height=450)
+    fig_hist.update_layout(**LAYOUT, margin=dict(l=0, r=0, t=20, b=0), xaxis_title=None, yaxis_title=None, hovermode="x unified")
+    fig_hist.update_traces(line_color=primary, line_width=3)
+    add_anomaly_markers(fig_hist, hist_df[hist_df['Outlier']], "异常高峰/低谷")
+    add_anomaly_markers(fig_hist, hist_df[hist_df['Estimated']], "断档均摊", symbol="circle-open")
+    return fig_hist
+
+def songs_daily(sub_df, theme_name):
+    fig = px.bar(sub_df.head(10), x='Daily_Num', y='Song', orientation='h', text='Daily_Num', color='Daily_Num', color_continuous_scale=color_scale(theme_name))
+    fig.update_layout(yaxis={'categoryorder':'total ascending'}, **LAYOUT)
+    return fig
+
+def songs_total(sub_df):
+    fig = px.bar(sub_df.head(10), x='Streams_Num', y='Song', orientation='h', text='Streams_Num', color='Streams_Num', color_continuous_scale='Turbo')
+    fig.update_layout(yaxis={'categoryorder':'total ascending'}, **LAYOUT)
+    return fig
+
+def albums_daily(sub_df):
+    fig = px.bar(sub_df.head(10), x='Base_Name', y='Daily_Num', text='Daily_Num', color='Base_Name')
+    fig.update_layout(**LAYOUT)
+    fig.update_traces(texttemplate='%{text:.2s}', textposition='outside')
+    return fig
+
+def albums_total(sub_df):
+    fig = px.bar(sub_df.head(10), x='Base_Name', y='Total_Num', text='Total_Num', color='Base_Name')
+    fig.update_layout(**LAYOUT)
+    return fig
+
+def item_trend(hist_df, item, color, anomalies=None):
+    """单曲/专辑历史走势 (可叠加异常点)"""
+    fig = px.line(hist_df, x='Date', y='Daily', markers=True, title=f"Trend: {item}", height=450)
+    fig.update_layout(plot_bgcolor='rgba(0,0,0,0)', font=dict(family="Times New Roman"), hovermode="x unified")
+    fig.update_traces(line_color=color, line_width=3)
+    if anomalies is not None: add_anomaly_markers(fig, anomalies, "异常")
+    return fig
+
+# --- 缓存 ---
+def _size(fig):
+    # 以序列化后的 JSON 长度估算占用 (Figure 内部是嵌套 dict，getsizeof 会严重低估)
+    return len(fig.to_json())
+
+def cached(chart_id, store_dir, data_date, theme_name, generation, build, item=None, aliases=None):
+    """
+    命中时直接返回缓存的 Figure，否则调用 build() 构建后放入缓存；并发会话同时未命中时只有一个在构建，其余等待。
+    build 返回 None (没有数据) 时不缓存；generation 一般为看板状态的指纹。
+    aliases 为改名覆盖文件的指纹 (song_index.overrides_fingerprint)：单曲按身份合并，覆盖文件变化后图表要重画
+    """
+    key = ("figure", store_dir, chart_id, data_date, aliases, theme_name, item)
+    return _CACHE.get_or_build(key, generation, build, size=_size)
+
+def clear():
+    _CACHE.discard(lambda key: key[0] == "figure")
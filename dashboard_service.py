@@ -0,0 +1,131 @@
+"""
+跨会话共享的看板数据服务：每位艺人、每个数据目录指纹只构建一次最新看板状态
+(snapshot 快照 + 页面直接使用的表格列、选择框选项、水晶球卡片文字)，所有会话并发读取同一份只读对象。
+  - 单飞: 数据更新后第一个请求负责重建，同时到达的请求等待这一次计算，而不是各算一遍 (memcache.get_or_build)
+  - 只读: dict 包成 MappingProxyType、list 转 tuple、DataFrame 数值列的底层数组不可写 (就地修改会抛 ValueError)，
+    派生操作 (切片、排序、选列) 照常返回新对象
+  - 数据目录的指纹每位艺人最多每 RECHECK_SECONDS 秒扫描一次，流量高峰时不会每个 rerun 都 scandir；
+    指纹包含改名覆盖文件 (song_index)，只改了覆盖文件也会重建
+取代 app.py 里每次命中都要反序列化一份副本的 st.cache_data，以及 api.py 自带的快照字典。
+并发会话下的渲染延迟见 loadtest.py。
+
+RECHECK_SECONDS 默认 1 秒，可用环境变量 ARI_RECHECK_SECONDS 调整 (0 表示每次都扫描)。
+"""
+import os
+import time
+import types
+import threading
+import numpy as np
+import pandas as pd
+
+import artists
+import memcache
+import snapshot
+import song_index
+from data_utils import dir_fingerprint
+
+RECHECK_SECONDS = float(os.environ.get("ARI_RECHECK_SECONDS", 1))
+# 看板表格展示的列 (st.dataframe)
+TABLE_COLUMNS = {
+    "songs_top_daily": ['Song', 'Daily_Num', 'Change', 'Change_7', 'Share'],
+    "songs_top_total": ['Song', 'Streams_Num', 'Avg_7Days', 'Next_Milestone'],
+    "albums_top_daily": ['Base_Name', 'Daily_Num', 'Change', 'Daily_Share'],
+    "albums_top_total": ['Base_Name', 'Total_Num', 'Total_Share'],
+}
+# 水晶球超过这个天数显示 N/A
+MAX_CARD_DAYS = 7300
+
+# 状态放在共享有界缓存中: ("dashboard", store_dir) -> (目录指纹, 只读状态)
+_CACHE = memcache.SHARED
+_LOCK = threading.Lock()
+# {artist_key: (扫描时间, 目录指纹)}
+_CHECKED = {}
+# 看板状态被构建的次数
+_STATS = {"builds": 0}
+
+# --- 只读化 ---
+def _frozen_frame(df):
+    """数值列换成不可写的 numpy 数组 (字符串列本身是不可变的 Arrow 数组)，列与 dtype 不变"""
+    columns = {}
+    for col in df.columns:
+        values = df[col].array
+        if isinstance(df[col].dtype, np.dtype):
+            values = df[col].to_numpy(copy=True)
+            values.setflags(write=False)
+        columns[col] = values
+    return pd.DataFrame(columns, index=df.index, copy=False)
+
+def freeze(value):
+    """递归转为只读结构: dict -> MappingProxyType, list -> tuple, DataFrame -> 数值不可写的 DataFrame"""
+    if isinstance(value, dict): return types.MappingProxyType({k: freeze(v) for k, v in value.items()})
+    if isinstance(value, (list, tuple)): return tuple(freeze(v) for v in value)
+    if isinstance(value, pd.DataFrame): return _frozen_frame(value)
+    return value
+
+# --- 状态构建 ---
+def _card(item):
+    """水晶球卡片上与主题无关的文字"""
+    in_range = item['Days'] < MAX_CARD_DAYS
+    return {
+        "Display": item['Display'],
+        "Total": f"{item['Total'] / 1_000_000_000:.3f} B",
+        "Milestone": f"{item['Milestone'] / 1_000_000_000:.0f}B",
+        "Remaining": f"{item['Remaining']:,}",
+        "Avg": f"+{int(item['Avg']):,}",
+        "Days": f"{int(item['Days'])} Days" if in_range else "N/A",
+        "Date": item['Date'] if in_range else "---",
+        # 衰减/星期模型的 80% 区间 (乐观 ~ 保守)
+        "Range": f"80%: {item['Date_Lo']} ~ {item['Date_Hi']}" if in_range and item['Date_Lo'] != item['Date_Hi'] else "",
+    }
+
+def build_state(artist_key=None, fingerprint=None):
+    """
+    某位艺人最新日期的看板状态 (未只读化)；没有数据时为 None。
+    在快照的基础上加: fingerprint, tables (各表格展示的列), song_options / album_options, crystal_cards
+    """
+    artist = artists.get(artist_key)
+    if not os.path.exists(artist["data_dir"]): return None
+    snap = snapshot.for_artist(artist["key"])
+    if snap is None: return None
+    state = dict(snap)
+    state["fingerprint"] = fingerprint
+    state["tables"] = {name: snap[name][columns] for name, columns in TABLE_COLUMNS.items() if snap[name] is not None}
+    state["song_options"] = snap['songs']['Song'].unique().tolist()
+    state["album_options"] = snap['albums']['Base_Name'].unique().tolist() if snap['albums'] is not None else []
+    state["crystal_cards"] = [_card(item) for item in snap['crystal_ball']]
+    return state
+
+# --- 共享访问 ---
+def _fingerprint(artist):
+    now = time.monotonic()
+    with _LOCK:
+        checked = _CHECKED.get(artist["key"])
+        if checked is not None and now - checked[0] < RECHECK_SECONDS: return checked[1]
+    fp = f"{dir_fingerprint(artist['data_dir'])}-{song_index.overrides_fingerprint(artist['data_dir'])}"
+    with _LOCK: _CHECKED[artist["key"]] = (now, fp)
+    return fp
+
+def _build(artist_key, fingerprint):
+    with _LOCK: _STATS["builds"] += 1
+    return freeze(build_state(artist_key, fingerprint))
+
+def get(artist_key=None):
+    """
+    当前的只读看板状态 (见 build_state)；没有数据时为 None。
+    目录指纹与已有状态一致时直接返回同一对象；否则只有一个调用方重建，其余等待它的结果 (重建失败时一起抛出)。
+    """
+    artist = artists.get(artist_key)
+    fp = _fingerprint(artist)
+    return _CACHE.get_or_build(("dashboard", artist["store_dir"]), fp, lambda: _build(artist["key"], fp))
+
+def clear():
+    """丢弃所有艺人的共享状态并清零计数 (基准/负载测试冷启动用)"""
+    _CACHE.discard(lambda key: key[0] == "dashboard")
+    with _LOCK:
+        _CHECKED.clear()
+        _STATS["builds"] = 0
+
+def stats():
+    """{builds: 看板状态构建次数, waits: 共享缓存里等待他人构建的次数 (看板状态与图表合计)}"""
+    with _LOCK: builds = _STATS["builds"]
+    return {"builds": builds, "waits": _CACHE.stats()["waits"]}
@@ -0,0 +1,184 @@
+import os
+import glob
+import json
+import zipfile
+import hashlib
+import pandas as pd
+
+# --- 数据目录 ---
+DATA_DIR = "daily_data"
+# 已结束月份的原始文件由 archive.py 打包为 <DATA_DIR>/archive/YYYY-MM.zip，清单见 manifest.json
+ARCHIVE_DIR = "archive"
+ARCHIVE_MANIFEST = "manifest.json"
+
+# --- 辅助函数 ---
+def normalize_text(text):
+    if not isinstance(text, str): return str(text)
+    text = text.replace("â€™", "'").replace("’", "'").replace("â„¢", "")
+    text = text.replace("*", "").strip()
+    return text
+
+def clean_number(x):
+    try: return int(str(x).replace(',', '').replace('+', '').split('.')[0])
+    except: return 0
+
+# --- 向量化版本 (整列处理，避免逐格 .apply) ---
+def normalize_texts(series):
+    """normalize_text 的整列版本"""
+    text = series.fillna('nan').astype(str)
+    text = text.str.replace("â€™", "'", regex=False).str.replace("’", "'", regex=False).str.replace("â„¢", "", regex=False)
+    return text.str.replace("*", "", regex=False).str.strip()
+
+def clean_numbers(series, return_invalid=False):
+    """
+    clean_number 的整列版本：去掉逗号/加号、截断小数，无法解析的值 (garbage) 记为 0。
+    return_invalid=True 时同时返回被记为 0 的无效值掩码 (摄入校验用)。
+    """
+    if pd.api.types.is_integer_dtype(series.dtype):
+        values = series.fillna(0).astype('int64')
+        return (values, series.isna().to_numpy()) if return_invalid else values
+    text = series.astype(str).str.replace(',', '', regex=False).str.replace('+', '', regex=False)
+    text = text.str.split('.', n=1).str[0].str.strip()
+    # 与 int() 一致：允许首尾空白和数字间的下划线
+    valid = text.str.fullmatch(r'-?[0-9]+(?:_[0-9]+)*').fillna(False).astype(bool)
+    text = text.where(valid, '0').str.replace('_', '', regex=False)
+    values = pd.to_numeric(text, errors='coerce').fillna(0).astype('int64')
+    return (values, ~valid.to_numpy()) if return_invalid else values
+
+# 各规范列在原始文件中可能的列名 (按优先级)；规范列本身已存在时原样使用
+SCHEMA_ALIASES = {
+    "Daily_Num": ("Daily_Num", "Daily_Raw", "Daily Raw", "Daily"),
+    "Streams_Num": ("Streams_Num", "Streams"),
+    "Total_Num": ("Total_Num", "Total", "Streams"),
+}
+SCHEMA_COLUMNS = {"songs": ("Streams_Num", "Daily_Num"), "albums": ("Total_Num", "Daily_Num")}
+
+def detect_schema(columns, is_album=False):
+    """识别列名变体: {规范列: 原始列名}，找不到的为 None"""
+    wanted = SCHEMA_COLUMNS["albums" if is_album else "songs"]
+    return {col: next((c for c in SCHEMA_ALIASES[col] if c in columns), None) for col in wanted}
+
+def standardize_columns(df, is_album=False):
+    """
+    统一列名，解决 Daily Raw, Daily_Raw, Daily 等不一致问题。
+    强制生成 'Daily_Num' 和 'Total_Num' (专辑) / 'Streams_Num' (单曲) 列，缺失的列记为 0。
+    """
+    if df is None: return None
+    for col, source in detect_schema(df.columns, is_album).items():
+        if source == col: continue
+        df[col] = clean_numbers(df[source]) if source else 0
+    return df
+
+# --- 文件读取 ---
+FILE_SUFFIX = {"songs": "_songs.csv", "albums": "_albums.csv", "meta": "_meta.json"}
+
+_ARCHIVE_CACHE = {}
+
+def archive_manifest(data_dir=DATA_DIR):
+    """
+    月度归档清单 {"months": {"YYYY-MM": {"file", "files": {文件名: {mtime, size, sha1}}}}}；没有归档时 months 为空。
+    按清单文件的 (mtime_ns, size) 缓存，归档不变时不重复解析。
+    """
+    path = os.path.join(data_dir, ARCHIVE_DIR, ARCHIVE_MANIFEST)
+    try: st_ = os.stat(path)
+    except OSError: return {"months": {}}
+    key = (os.path.abspath(path), st_.st_mtime_ns, st_.st_size)
+    if key not in _ARCHIVE_CACHE:
+        with open(path, 'r', encoding='utf-8') as f: _ARCHIVE_CACHE[key] = json.load(f)
+    return _ARCHIVE_CACHE[key]
+
+def _archive_member(path):
+    """归档成员的虚拟路径 <data_dir>/archive/YYYY-MM.zip/<文件名> -> (zip 路径, 文件名)；普通文件返回 None"""
+    parent = os.path.dirname(path)
+    if not parent.endswith(".zip") or os.path.basename(os.path.dirname(parent)) != ARCHIVE_DIR: return None
+    return parent, os.path.basename(path)
+
+def list_daily_files(kind, data_dir=DATA_DIR, start=None, end=None):
+    """
+    按日期排序列出某类每日文件 (songs / albums / meta)，包括已归档月份里的文件 (虚拟路径，用 open_daily 打开)。
+    同名文件以目录里的原始文件为准；给了 start / end (YYYY-MM-DD，含两端) 时只列出该范围，并跳过不相关月份的归档。
+    """
+    if not os.path.exists(data_dir): return []
+    files = {os.path.basename(p): p for p in glob.glob(os.path.join(data_dir, f"*{FILE_SUFFIX[kind]}"))}
+    for month, info in archive_manifest(data_dir)['months'].items():
+        if (start and month < start[:7]) or (end and month > end[:7]): continue
+        zip_path = os.path.join(data_dir, ARCHIVE_DIR, info['file'])
+        for name in info['files']:
+            if name.endswith(FILE_SUFFIX[kind]): files.setdefault(name, os.path.join(zip_path, name))
+    return [files[name] for name in sorted(files)
+            if (start is None or date_of(name) >= start) and (end is None or date_of(name) <= end)]
+
+def open_daily(path):
+    """以二进制方式打开每日文件；归档成员直接从 zip 中流式读取"""
+    member = _archive_member(path)
+    if member is None: return open(path, 'rb')
+    # zip 本身关闭后，已打开的成员仍可读到关闭为止
+    with zipfile.ZipFile(member[0]) as archive: return archive.open(member[1])
+
+def daily_file_info(path, data_dir=DATA_DIR):
+    """(mtime, size, sha1)；普通文件取 stat，sha1 为 None (需要时再计算)，归档成员取归档清单里记录的原始值"""
+    member = _archive_member(path)
+    if member is None:
+        st_ = os.stat(path)
+        return st_.st_mtime, st_.st_size, None
+    month = os.path.basename(member[0])[:-len(".zip")]
+    info = archive_manifest(data_dir)['months'][month]['files'][member[1]]
+    return info['mtime'], info['size'], info['sha1']
+
+def file_fingerprints(data_dir=DATA_DIR):
+    """
+    各类每日文件的内容指纹 {kind: sha1}，由排序后的 (文件名, mtime_ns, size) 计算。
+    一次 scandir 完成；目录不变时指纹不变，可直接作为缓存键 (取代按时间过期的 TTL)。
+    归档清单的 (mtime_ns, size) 计入每一类的指纹，打包/补充归档后指纹随之变化。
+    """
+    entries = {kind: [] for kind in FILE_SUFFIX}
+    try:
+        st_ = os.stat(os.path.join(data_dir, ARCHIVE_DIR, ARCHIVE_MANIFEST))
+        for v in entries.values(): v.append((ARCHIVE_DIR, st_.st_mtime_ns, st_.st_size))
+    except OSError: pass
+    if os.path.isdir(data_dir):
+        with os.scandir(data_dir) as it:
+            for e in it:
+                if e.name.startswith('.'): continue
+                for kind, suffix in FILE_SUFFIX.items():
+                    if e.name.endswith(suffix):
+                        st_ = e.stat()
+                        entries[kind].append((e.name, st_.st_mtime_ns, st_.st_size))
+                        break
+    return {kind: hashlib.sha1(repr(sorted(v)).encode()).hexdigest() for kind, v in entries.items()}
+
+def dir_fingerprint(data_dir=DATA_DIR):
+    """整个数据目录的指纹 (三类文件指纹合并)"""
+    fps = file_fingerprints(data_dir)
+    return hashlib.sha1("".join(fps[k] for k in sorted(fps)).encode()).hexdigest()
+
+def date_of(path):
+    """从 YYYY-MM-DD_xxx 文件名中取出日期字符串"""
+    return os.path.basename(path).split('_')[0]
+
+# 读取时一次性声明类型：名称列按字符串读，数字列交给 C 解析器处理千分位逗号
+READ_OPTIONS = {"dtype": {"Song": str, "Base_Name": str}, "thousands": ","}
+
+# 解析后只保留名称和数值列，原始字符串列 (Daily_Raw / Streams / Total ...) 不再随 DataFrame 常驻内存
+KEEP_COLUMNS = {"songs": ['Song', 'Streams_Num', 'Daily_Num'], "albums": ['Base_Name', 'Total_Num', 'Daily_Num']}
+# meta 文件中入库的字段
+META_FIELDS = ("career_total", "listeners", "listeners_rank", "listeners_peak", "listeners_pk_count")
+
+def read_songs_file(path):
+    with open_daily(path) as f: df = pd.read_csv(f, **READ_OPTIONS)
+    df['Song'] = normalize_texts(df['Song'])
+    return standardize_columns(df, is_album=False)[KEEP_COLUMNS["songs"]]
+
+def read_albums_file(path):
+    with open_daily(path) as f: df = pd.read_csv(f, **READ_OPTIONS)
+    return standardize_columns(df, is_album=True)[KEEP_COLUMNS["albums"]]
+
+def read_meta_file(path):
+    with open_daily(path) as f:
+        return json.load(f)
+
+def listeners_count(meta):
+    """listeners 字段可能是数字，也可能是 {'count': ...}"""
+    l_val = meta.get('listeners', 0)
+    if isinstance(l_val, dict): l_val = l_val.get('count', 0)
+    return l_val
@@ -0,0 +1,184 @@
+"""
+批量导出：把历史仓库里任意日期范围、任意条目子集写成 Parquet / Arrow IPC / (压缩) CSV，供 notebook 分析。
+直接按 manifest 流式读取分段 (history_store.segment_plan)：分段按日期有序，逐个 row group、逐批读取，
+按日期切开后多个分段归并成一天一天的数据，攒够 WRITE_ROWS 行就写出。内存只与批大小有关，与导出的天数无关。
+
+输出为长表 Date (date32), Name, Streams, Daily (meta 为 Date + META_FIELDS)；格式由扩展名决定:
+    .parquet   .arrow / .feather / .ipc   .csv   .csv.gz / .csv.bz2 / .csv.zst
+
+    python export.py songs history.parquet --start 2025-12-01 --end 2026-02-28
+    python export.py songs rings.csv.gz --item "7 rings" --item "The Way" --min-streams 100000000
+    python export.py albums albums.arrow
+"""
+import os
+import heapq
+import contextlib
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+
+import history_store
+import song_index
+from data_utils import DATA_DIR, META_FIELDS
+
+# 读取分段时每批的行数，以及攒够多少行写一次 (Parquet 的 row group 大小)
+BATCH_ROWS = 1 << 16
+WRITE_ROWS = 1 << 17
+READ_BUFFER = 1 << 20
+# 扩展名 -> (格式, 压缩)
+FORMATS = {
+    ".parquet": ("parquet", "zstd"),
+    ".arrow": ("arrow", "zstd"), ".feather": ("arrow", "zstd"), ".ipc": ("arrow", "zstd"),
+    ".csv": ("csv", None), ".csv.gz": ("csv", "gzip"), ".csv.bz2": ("csv", "bz2"), ".csv.zst": ("csv", "zstd"),
+}
+
+def detect_format(path):
+    """按扩展名返回 (格式, 压缩)，不支持的扩展名抛 ValueError"""
+    name = path.lower()
+    for ext in sorted(FORMATS, key=len, reverse=True):
+        if name.endswith(ext): return FORMATS[ext]
+    raise ValueError(f"unsupported export format: {path} (use one of {', '.join(FORMATS)})")
+
+def _schema(kind):
+    if kind == "meta": return pa.schema([("Date", pa.date32())] + [(k, pa.int64()) for k in META_FIELDS])
+    return pa.schema([("Date", pa.date32()), ("Name", pa.string()), ("Streams", pa.int64()), ("Daily", pa.int64())])
+
+# --- 读取 ---
+def _row_groups(pf, lo, hi):
+    """按 Date 列的统计信息跳过完全落在 [lo, hi] 之外的 row group"""
+    col = pf.schema_arrow.get_field_index('Date')
+    keep = []
+    for i in range(pf.num_row_groups):
+        stats = pf.metadata.row_group(i).column(col).statistics
+        if stats is not None and stats.has_min_max and (stats.max < lo or stats.min > hi): continue
+        keep.append(i)
+    return keep
+
+def _segment_days(path, dates):
+    """单个分段里属于 dates 的行，按日期逐天产出 (date, pa.Table)；分段内的行按日期有序"""
+    wanted = pa.array(dates, type=pa.string())
+    # buffer_size: 按页流式解码列块，而不是把整个 row group 的列块一次读进内存
+    pf = pq.ParquetFile(path, buffer_size=READ_BUFFER, pre_buffer=False)
+    groups = _row_groups(pf, dates[0], dates[-1])
+    if not groups: return
+    current, pending = None, []
+    for batch in pf.iter_batches(batch_size=BATCH_ROWS, row_groups=groups):
+        table = pa.Table.from_batches([batch])
+        table = table.filter(pc.is_in(table['Date'].cast(pa.string()), value_set=wanted))
+        if not table.num_rows: continue
+        day = table['Date'].to_numpy(zero_copy_only=False)
+        starts = np.r_[0, np.flatnonzero(day[1:] != day[:-1]) + 1]
+        for s, e in zip(starts, np.r_[starts[1:], len(day)]):
+            if current is not None and day[s] != current:
+                yield current, pa.concat_tables(pending)
+                pending = []
+            current = day[s]
+            pending.append(table.slice(s, e - s))
+    if pending: yield current, pa.concat_tables(pending)
+
+def _name_filter(kind, items, data_dir, store_dir):
+    """条目子集 -> 仓库里的原始名称 (单曲包含同一身份的所有写法)"""
+    if items is None: return None
+    if kind == "songs": items = [raw for item in items for raw in song_index.members(item, data_dir, store_dir)]
+    return pa.array(sorted(set(items)), type=pa.string())
+
+def _canonical(names, aliases):
+    """原始名称 -> 当前写法 (只替换改过名的条目)"""
+    idx = pc.index_in(names, value_set=aliases[0])
+    return pc.coalesce(pc.take(aliases[1], idx), names)
+
+def iter_days(kind="songs", start=None, end=None, items=None, min_streams=None, canonical=True,
+              data_dir=DATA_DIR, store_dir=history_store.STORE_DIR):
+    """
+    按日期升序逐天产出 (YYYY-MM-DD, pa.Table)，列同 export 的输出 (Date 仍为字符串)。
+    items: 只导出这些单曲/专辑 (单曲可用任意写法，旧名也会一起导出)；min_streams: 只保留总量不低于该值的行。
+    canonical: 单曲名称统一为当前写法 (song_index)。过滤后为空的日期不产出。
+    """
+    if kind not in history_store.KINDS: raise ValueError(f"kind must be one of {history_store.KINDS}")
+    plan = history_store.segment_plan(kind, start, end, data_dir, store_dir)
+    wanted = _name_filter(kind, items, data_dir, store_dir) if kind != "meta" else None
+    aliases = None
+    if kind == "songs" and canonical:
+        idx = song_index.load(data_dir, store_dir)
+        renamed = [(raw, name) for raw, name in idx["aliases"].items() if raw != name]
+        aliases = (pa.array([r for r, _ in renamed], type=pa.string()), pa.array([n for _, n in renamed], type=pa.string()))
+    columns = _schema(kind).names
+    days = heapq.merge(*(_segment_days(path, dates) for path, dates in plan), key=lambda x: x[0])
+    try:
+        for date, table in days:
+            table = table.select(columns)
+            if kind != "meta":
+                table = table.set_column(1, "Name", table['Name'].cast(pa.string()))
+                if wanted is not None: table = table.filter(pc.is_in(table['Name'], value_set=wanted))
+                if min_streams is not None: table = table.filter(pc.greater_equal(table['Streams'], int(min_streams)))
+                if aliases is not None and len(aliases[0]):
+                    table = table.set_column(1, "Name", _canonical(table['Name'], aliases))
+            if table.num_rows: yield str(date), table
+    except FileNotFoundError as e:
+        # 导出途中另一个进程合并了分段
+        raise RuntimeError(f"history store was compacted during export, retry: {e}") from e
+
+# --- 写出 ---
+def _open_writer(stack, path, fmt, codec, schema):
+    if fmt == "parquet": return stack.enter_context(pq.ParquetWriter(path, schema, compression=codec))
+    sink = stack.enter_context(pa.CompressedOutputStream(path, codec) if codec and fmt == "csv" else pa.OSFile(path, "wb"))
+    if fmt == "arrow":
+        return stack.enter_context(pa.ipc.new_file(sink, schema, options=pa.ipc.IpcWriteOptions(compression=codec)))
+    return stack.enter_context(pacsv.CSVWriter(sink, schema))
+
+def export(path, kind="songs", start=None, end=None, items=None, min_streams=None, canonical=True,
+           data_dir=DATA_DIR, store_dir=history_store.STORE_DIR):
+    """
+    把 [start, end] 范围内 (含两端) 的历史流式写到 path，格式由扩展名决定 (见 FORMATS)。
+    先写临时文件再替换，导出失败不会留下半个文件。返回 {path, format, rows, days, first, last, bytes}。
+    """
+    fmt, codec = detect_format(path)
+    schema = _schema(kind)
+    tmp = path + ".tmp"
+    rows, n_days, first, last = 0, 0, None, None
+    try:
+        with contextlib.ExitStack() as stack:
+            writer = _open_writer(stack, tmp, fmt, codec, schema)
+            buffered, n_buffered = [], 0
+
+            def flush():
+                table = pa.concat_tables(buffered)
+                table = table.set_column(0, "Date", table['Date'].cast(pa.string()).cast(pa.date32())).cast(schema)
+                if fmt == "parquet": writer.write_table(table, row_group_size=len(table))
+                else: writer.write_table(table)
+
+            for date, table in iter_days(kind, start, end, items, min_streams, canonical, data_dir, store_dir):
+                buffered.append(table)
+                n_buffered += table.num_rows
+                rows, n_days, last = rows + table.num_rows, n_days + 1, date
+                first = first or date
+                if n_buffered >= WRITE_ROWS:
+                    flush()
+                    buffered, n_buffered = [], 0
+            if buffered: flush()
+        os.replace(tmp, path)
+    except BaseException:
+        with contextlib.suppress(OSError): os.remove(tmp)
+        raise
+    return {"path": path, "format": fmt if codec is None else f"{fmt}+{codec}", "rows": rows, "days": n_days,
+            "first": first, "last": last, "bytes": os.path.getsize(path)}
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Export tracker history to Parquet, Arrow IPC or compressed CSV.")
+    parser.add_argument("kind", choices=history_store.KINDS)
+    parser.add_argument("path", help=f"output file ({', '.join(FORMATS)})")
+    parser.add_argument("--start", help="first date, YYYY-MM-DD")
+    parser.add_argument("--end", help="last date, YYYY-MM-DD")
+    parser.add_argument("--item", action="append", dest="items", help="song/album name (repeatable)")
+    parser.add_argument("--min-streams", type=float)
+    parser.add_argument("--raw-names", action="store_true", help="keep stored spellings instead of current song names")
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--store-dir", default=history_store.STORE_DIR)
+    args = parser.parse_args()
+    result = export(args.path, args.kind, args.start, args.end, args.items, args.min_streams, not args.raw_names,
+                    args.data_dir, args.store_dir)
+    print(f"{result['rows']:,} rows, {result['days']} days ({result['first']} ~ {result['last']}) "
+          f"-> {result['path']} [{result['format']}, {result['bytes'] / 2**20:.2f} MB]")
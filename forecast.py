@@ -0,0 +1,250 @@
+"""
+批量预测：在日历对齐的 日期 × 名称 宽表上，一次性 (NumPy 批量加权最小二乘) 为所有单曲/专辑拟合
+    log(日增) = 水平 + 斜率 × t + 星期效应
+  - 衰减: 斜率为负的新歌/节日专辑按阻尼趋势 (每天 × DAMPING) 逐渐放缓，而不是按 7 日均值匀速外推
+  - 季节: 周一 ~ 周日的星期效应 (周五发行日、周末高峰)
+  - 近期权重按 HALF_LIFE 天减半，并做一轮 Huber 降权，单日尖峰不会主导拟合
+由水平/斜率的标准误得到乐观/中位/保守三条日增路径，累加后求每个里程碑档位的 ETA 分布 (P10 / P50 / P90)。
+拟合结果按文件指纹放在 memcache.SHARED 中，数据不变不重复拟合。
+
+    python forecast.py --kind albums --step 1000000000
+"""
+import warnings
+from statistics import NormalDist
+import numpy as np
+import pandas as pd
+
+import history_store
+import memcache
+import milestones
+from data_utils import DATA_DIR
+
+FIT_DAYS = 56
+HALF_LIFE = 14
+DAMPING = 0.98
+# 每天 log 斜率的上下限 (约 +2% / -10% 每天)，防止短期波动外推成指数爆炸/归零
+MAX_GROWTH = 0.02
+MAX_DECAY = 0.10
+MIN_OBS = 7
+HUBER_K = 2.5
+# 星期效应的岭回归强度 (约等于一天观测的权重)，观测少的条目星期效应收缩到 0
+DOW_RIDGE = 1.0
+# 水平的标准误下限：源站不刷新时日增连续相同，残差为 0 会让区间失真
+MIN_LEVEL_SD = 0.05
+FALLBACK_SIGMA = 0.5
+HORIZON = 730
+CONFIDENCE = 0.8
+
+_CACHE = memcache.SHARED
+_N_PARAMS = 8  # 截距、斜率、周二 ~ 周日 6 个星期效应 (周一为基准)
+
+def weekdays(dates):
+    """datetime64[D] -> 星期几 (周一=0)"""
+    return (np.asarray(dates, dtype='datetime64[D]').astype('int64') + 3) % 7
+
+def _design(n_rows, wd):
+    X = np.zeros((n_rows, _N_PARAMS))
+    X[:, 0] = 1.0
+    X[:, 1] = np.arange(n_rows) - (n_rows - 1)  # 最后一天 t=0，截距即当前水平
+    rows = np.flatnonzero(wd > 0)
+    X[rows, 1 + wd[rows]] = 1.0
+    return X
+
+def _wls(X, w, y):
+    """对每一列 (条目) 独立求加权最小二乘: 返回 (beta[N, p], A^-1[N, p, p])"""
+    A = np.einsum('tp,tn,tq->npq', X, w, X)
+    ridge = np.full(_N_PARAMS, 1e-6)
+    ridge[2:] = DOW_RIDGE
+    A += np.diag(ridge)
+    b = np.einsum('tp,tn,tn->np', X, w, y)
+    A_inv = np.linalg.inv(A)
+    return np.einsum('npq,nq->np', A_inv, b), A_inv
+
+def fit_models(values, wd):
+    """
+    values: float[天 × 条目] 日历对齐的日增 (NaN / 非正值为缺失)，wd: 每行的星期几。
+    返回 dict: level, slope, dow[N, 7], sigma, sd_level, sd_slope, cov_ls, n_obs (均为按条目的数组)
+    """
+    T, N = values.shape
+    with np.errstate(divide='ignore', invalid='ignore'):
+        y = np.log(np.where(values > 0, values, np.nan))
+    valid = np.isfinite(y)
+    y = np.where(valid, y, 0.0)
+    n_obs = valid.sum(axis=0)
+    X = _design(T, wd)
+    recency = 0.5 ** ((T - 1 - np.arange(T)) / HALF_LIFE)
+    w = np.where(valid, recency[:, None], 0.0)
+    # 权重归一化到平均每个有效观测为 1，使岭回归强度与协方差尺度一致
+    w = w * (n_obs / np.maximum(w.sum(axis=0), 1e-12))
+
+    dof = np.maximum(n_obs - _N_PARAMS, 1)
+    beta, A_inv = _wls(X, w, y)
+    resid = np.where(valid, y - X @ beta.T, 0.0)
+    sigma = np.sqrt((w * resid ** 2).sum(axis=0) / dof)
+    # Huber 降权: 残差超过 HUBER_K 个 sigma 的观测按比例减小权重后重新拟合一次
+    scale = np.abs(resid) / np.maximum(HUBER_K * sigma, 1e-9)
+    w = w * np.minimum(1.0, 1.0 / np.maximum(scale, 1e-12))
+    beta, A_inv = _wls(X, w, y)
+    resid = np.where(valid, y - X @ beta.T, 0.0)
+    sigma = np.sqrt((w * resid ** 2).sum(axis=0) / dof)
+
+    cov = sigma[:, None, None] ** 2 * A_inv
+    level, slope = beta[:, 0], np.clip(beta[:, 1], -MAX_DECAY, MAX_GROWTH)
+    dow = np.concatenate([np.zeros((N, 1)), beta[:, 2:]], axis=1)
+    sd_level = np.maximum(np.sqrt(np.maximum(cov[:, 0, 0], 0)), MIN_LEVEL_SD)
+    sd_slope = np.sqrt(np.maximum(cov[:, 1, 1], 0))
+    cov_ls = cov[:, 0, 1]
+
+    # 观测太少的条目退化为"最近均值匀速"模型
+    few = n_obs < MIN_OBS
+    if few.any():
+        with warnings.catch_warnings(), np.errstate(invalid='ignore', divide='ignore'):
+            warnings.simplefilter("ignore", category=RuntimeWarning)
+            recent_mean = np.nanmean(np.where(values[:, few] > 0, values[:, few], np.nan)[-MIN_OBS:], axis=0)
+            level[few] = np.log(recent_mean)
+        slope[few] = 0.0
+        dow[few] = 0.0
+        sigma[few] = sd_level[few] = FALLBACK_SIGMA
+        sd_slope[few] = cov_ls[few] = 0.0
+    return {"level": level, "slope": slope, "dow": dow, "sigma": sigma, "sd_level": sd_level,
+            "sd_slope": sd_slope, "cov_ls": cov_ls, "n_obs": n_obs}
+
+def _damped(horizon):
+    """第 h 天 (1..horizon) 的累计阻尼趋势系数 φ(1-φ^h)/(1-φ)"""
+    h = np.arange(1, horizon + 1)
+    return DAMPING * (1 - DAMPING ** h) / (1 - DAMPING)
+
+def rate_paths(models, first_weekday, horizon=HORIZON, z=0.0):
+    """未来 horizon 天的预测日增 float[条目 × 天]；z 为标准正态分位 (0 为中位数路径)"""
+    damp = _damped(horizon)
+    wd = (first_weekday + np.arange(horizon)) % 7
+    mu = models["level"][:, None] + models["slope"][:, None] * damp + models["dow"][:, wd]
+    if z:
+        var = (models["sd_level"][:, None] ** 2 + (damp * models["sd_slope"][:, None]) ** 2
+               + 2 * damp * models["cov_ls"][:, None])
+        mu = mu + z * np.sqrt(np.maximum(var, 0))
+    with np.errstate(over='ignore', invalid='ignore'):
+        return np.nan_to_num(np.exp(mu), nan=0.0, posinf=0.0)
+
+def days_to_reach(rates, remaining):
+    """
+    rates: float[条目 × 天] 预测日增；remaining: float[条目 × 档位] 距离各档位的差距。
+    返回 float[条目 × 档位] 达成所需天数 (可为小数)；超过预测期后按最后一周的平均日增匀速外推，无法达成为 inf。
+    """
+    n, horizon = rates.shape
+    cum = np.cumsum(rates, axis=1)
+    idx = (cum[:, None, :] < remaining[:, :, None]).sum(axis=2)
+    inside = idx < horizon
+    safe = np.minimum(idx, horizon - 1)
+    rows = np.arange(n)[:, None]
+    before = np.where(idx > 0, cum[rows, np.maximum(safe - 1, 0)], 0.0)
+    rate_at = rates[rows, safe]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        days_in = safe + (remaining - before) / rate_at
+        tail = rates[:, -7:].mean(axis=1)[:, None]
+        days_out = horizon + (remaining - cum[:, -1:]) / tail
+    days = np.where(inside, days_in, np.where(tail > 0, days_out, np.inf))
+    days = np.where(remaining <= 0, 0.0, days)
+    return np.where(np.isfinite(days) & (days < milestones.MAX_ETA_DAYS), days, np.inf)
+
+# --- 数据层入口 ---
+def item_models(kind="songs", data_dir=DATA_DIR, store_dir=history_store.STORE_DIR):
+    """
+    最新上传日在榜的所有条目的模型 (按文件指纹缓存):
+    {"names", "totals", "models", "data_date" (datetime64[D])}
+    """
+    fp = history_store.fingerprint(kind, data_dir, store_dir)
+    cached = _CACHE.get(("forecast", store_dir, kind), fp)
+    if cached is not None: return cached
+    compact = history_store.compact_history(kind, data_dir, store_dir)
+    dates = compact["dates"]
+    if not len(dates):
+        result = {"names": compact["names"], "totals": np.zeros(0, dtype='int64'), "models": None, "data_date": None}
+        return _CACHE.put(("forecast", store_dir, kind), fp, result)
+    calendar, rows = history_store.calendar_rows(dates)
+    calendar, rows = calendar[-FIT_DAYS:], rows[-FIT_DAYS:]
+    live = np.flatnonzero(compact["present"][-1])
+    values = np.full((len(calendar), len(live)), np.nan)
+    have = rows >= 0
+    values[have] = np.where(compact["present"][rows[have]][:, live], compact["Daily"][rows[have]][:, live], np.nan)
+    result = {
+        "names": compact["names"][live],
+        "totals": compact["Streams"][-1, live],
+        "models": fit_models(values, weekdays(calendar)),
+        "data_date": dates[-1],
+    }
+    return _CACHE.put(("forecast", store_dir, kind), fp, result)
+
+def _tiers(totals, step, thresholds, n_tiers):
+    """每个条目要预测的里程碑: int64[条目 × 档位]，不存在的档位为 0"""
+    if thresholds is not None:
+        thresholds = np.sort(np.asarray(thresholds, dtype='int64'))
+        tiers = np.broadcast_to(thresholds, (len(totals), len(thresholds)))
+        return np.where(tiers > totals[:, None], tiers, 0)
+    first = (totals // step + 1) * step
+    return first[:, None] + step * np.arange(n_tiers)[None, :]
+
+def milestone_forecast(kind="songs", step=None, thresholds=None, n_tiers=3, names=None,
+                       confidence=CONFIDENCE, data_dir=DATA_DIR, store_dir=history_store.STORE_DIR):
+    """
+    所有在榜条目各里程碑档位的 ETA 分布 (每个条目 × 档位一行):
+    DataFrame[Name, Total, Tier, Milestone, Remaining, Speed, Days, Days_Lo, Days_Hi, ETA_Str, ETA_Lo, ETA_Hi]
+      step 模式: 接下来 n_tiers 个 step 的整数倍 (默认单曲 100M / 专辑 1B)；thresholds 模式: 所有高于当前总量的阈值
+      Speed 为未来 7 天的中位预测日均；Days_Lo / Days_Hi 为 confidence 区间 (乐观 / 保守)，ETA 从数据日期起算
+    """
+    fitted = item_models(kind, data_dir, store_dir)
+    if step is None and thresholds is None: step = milestones.MILESTONE_100M if kind == "songs" else milestones.MILESTONE_1B
+    columns = ['Name', 'Total', 'Tier', 'Milestone', 'Remaining', 'Speed', 'Days', 'Days_Lo', 'Days_Hi', 'ETA_Str', 'ETA_Lo', 'ETA_Hi']
+    if fitted["models"] is None: return pd.DataFrame(columns=columns)
+    pick = np.arange(len(fitted["names"])) if names is None else np.flatnonzero(fitted["names"].isin(list(names)))
+    models = {k: v[pick] for k, v in fitted["models"].items()}
+    totals = fitted["totals"][pick]
+    tiers = _tiers(totals, step, thresholds, n_tiers)
+    remaining = (tiers - totals[:, None]).astype('float64')
+
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    first_wd = int(weekdays(fitted["data_date"] + 1))
+    paths = {name: rate_paths(models, first_wd, z=zq) for name, zq in (("Days", 0.0), ("Days_Lo", z), ("Days_Hi", -z))}
+    days = {name: days_to_reach(rates, remaining) for name, rates in paths.items()}
+
+    n, k = tiers.shape
+    keep = (tiers > 0).ravel()
+    out = pd.DataFrame({
+        'Name': np.repeat(fitted["names"][pick].to_numpy(dtype=object), k),
+        'Total': np.repeat(totals, k),
+        'Tier': np.tile(np.arange(1, k + 1), n),
+        'Milestone': tiers.ravel(),
+        'Remaining': (tiers - totals[:, None]).ravel(),
+        'Speed': np.repeat(paths["Days"][:, :7].mean(axis=1), k),
+        **{name: d.ravel() for name, d in days.items()},
+    })[keep].reset_index(drop=True)
+    start = fitted["data_date"]
+    for col, src in (('ETA_Str', 'Days'), ('ETA_Lo', 'Days_Lo'), ('ETA_Hi', 'Days_Hi')):
+        finite = np.isfinite(out[src].to_numpy())
+        eta = start + np.ceil(np.where(finite, out[src], 0)).astype('int64').astype('timedelta64[D]')
+        out[col] = np.where(finite, np.datetime_as_string(eta, unit='D'), "Unknown")
+    return out[columns]
+
+def model_summary(kind="songs", data_dir=DATA_DIR, store_dir=history_store.STORE_DIR):
+    """各条目的拟合参数: DataFrame(index=Name)[Total, Level, Daily_Decay, Sigma, Obs]，Daily_Decay 为每天的变化率"""
+    fitted = item_models(kind, data_dir, store_dir)
+    if fitted["models"] is None: return pd.DataFrame(columns=['Total', 'Level', 'Daily_Decay', 'Sigma', 'Obs'])
+    m = fitted["models"]
+    return pd.DataFrame({'Total': fitted["totals"], 'Level': np.exp(m["level"]), 'Daily_Decay': np.expm1(m["slope"]),
+                         'Sigma': m["sigma"], 'Obs': m["n_obs"]}, index=fitted["names"])
+
+if __name__ == "__main__":
+    import time
+    import argparse
+    parser = argparse.ArgumentParser(description="Fit per-item decay/weekly models and print milestone ETA ranges.")
+    parser.add_argument("--kind", choices=["songs", "albums"], default="albums")
+    parser.add_argument("--step", type=int, default=None)
+    parser.add_argument("--tiers", type=int, default=3)
+    parser.add_argument("--top", type=int, default=20)
+    args = parser.parse_args()
+    history_store.ingest()
+    t0 = time.perf_counter()
+    result = milestone_forecast(args.kind, step=args.step, n_tiers=args.tiers)
+    print(f"{len(result)} item x tier forecasts in {time.perf_counter() - t0:.3f}s")
+    with pd.option_context('display.width', 200, 'display.max_columns', 20):
+        print(result.sort_values('Days').head(args.top).to_string(index=False))
@@ -0,0 +1,571 @@
+"""
+历史数据仓库：把 daily_data 下的每日文件合并成长表 (songs / albums / meta)，
+以 Parquet 列式文件落盘。冷启动只需读取这几个文件，而不是逐个解析 N×3 个原始文件。
+
+增量摄入：manifest.json 记录每个原始文件的 (mtime, size, sha1)、它所在的分段以及校验问题 (validate.py)。
+每次 ingest 只解析新增或被替换的文件，按月份写成新的 delta 分段；delta 过多时并入按月分区的 base 分段
+(base-YYYY-MM-*.parquet)，只重写 delta 涉及的月份。按日期范围读取 (load_range) 只打开覆盖该范围的分段。
+被隔离的文件同样登记在 manifest 中，内容不变就不会再次解析。仓库里只有规范列，下游直接读取。
+多个进程 (看板、snapshot.py、validate.py 等) 写同一个仓库时由 <store_dir>/.lock 上的文件锁 (store_lock) 依次进行。
+"""
+import os
+import json
+import hashlib
+import threading
+import warnings
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+import memcache
+import validate
+from data_utils import (
+    DATA_DIR, KEEP_COLUMNS, META_FIELDS, list_daily_files, date_of, file_fingerprints, open_daily, daily_file_info,
+)
+
+STORE_DIR = ".history_store"
+KINDS = ("songs", "albums", "meta")
+MAX_DELTA_SEGMENTS = 16
+MANIFEST_VERSION = 4
+# 冷启动并行解析的线程数上限，可用 ARI_PARSE_WORKERS / ARI_PARSE_EXECUTOR=process 调整
+MAX_WORKERS = int(os.environ.get("ARI_PARSE_WORKERS", min(8, os.cpu_count() or 1)))
+PARSE_EXECUTOR = os.environ.get("ARI_PARSE_EXECUTOR", "thread")
+
+_LOCK = threading.RLock()
+# 本进程已持有的文件锁: {store_dir: [锁文件, 重入层数]}
+_HELD = {}
+LOCK_FILE = ".lock"
+# 长表/宽表/单曲历史放在进程共享的有界 LRU memcache.SHARED 中 (所有艺人共用一个内存限额):
+#   ("table", store_dir, kind) / ("compact", store_dir, kind) / ("item", store_dir, kind, name)
+#   / ("compact", store_dir, "songs", "identity") (song_index 按身份合并后的历史)
+#   -> (该类文件的指纹, DataFrame 或紧凑数组)
+# 指纹由 (文件名, mtime, size) 计算，目录不变就一直复用；某类文件变化只让这一类的条目失效。
+_CACHE = memcache.SHARED
+# 上次摄入时的目录指纹: {(data_dir, store_dir): {kind: fingerprint}}
+_FINGERPRINTS = {}
+
+def _manifest_path(store_dir):
+    return os.path.join(store_dir, "manifest.json")
+
+def _segment_path(store_dir, kind, segment):
+    return os.path.join(store_dir, kind, segment)
+
+def _empty_table(kind):
+    if kind == "meta":
+        return pd.DataFrame({'Date': pd.Series(dtype=str), **{k: pd.Series(dtype='int64') for k in META_FIELDS}})
+    return pd.DataFrame({'Date': pd.Series(dtype=str), 'Name': pd.Series(dtype=str),
+                         'Streams': pd.Series(dtype='int64'), 'Daily': pd.Series(dtype='int64')})
+
+def _file_sha1(path):
+    h = hashlib.sha1()
+    with open_daily(path) as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''): h.update(chunk)
+    return h.hexdigest()
+
+# --- 跨进程锁 ---
+@contextmanager
+def store_lock(store_dir=STORE_DIR):
+    """
+    写仓库 (摄入、合并、重建) 的锁: 进程内 _LOCK 加上 <store_dir>/.lock 上的文件锁，
+    看板、snapshot.py、validate.py 等多个进程同时摄入同一个仓库时依次进行。同一线程内可重入。
+    """
+    with _LOCK:
+        held = _HELD.get(store_dir)
+        if held is not None:
+            held[1] += 1
+            try: yield
+            finally: held[1] -= 1
+            return
+        os.makedirs(store_dir, exist_ok=True)
+        f = open(os.path.join(store_dir, LOCK_FILE), 'a+b')
+        try:
+            _lock_file(f)
+            _HELD[store_dir] = [f, 1]
+            try: yield
+            finally: del _HELD[store_dir]
+        finally:
+            f.close()  # 关闭文件即释放文件锁
+
+def _lock_file(f):
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        return
+    # Windows: LK_LOCK 重试约 10 秒后抛 OSError，持锁方较慢时继续等
+    while True:
+        try:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            return
+        except OSError:
+            continue
+
+# --- manifest ---
+def _new_manifest():
+    return {"version": MANIFEST_VERSION, "generation": 0, "next_seq": 0,
+            "files": {}, "segments": {kind: [] for kind in KINDS}}
+
+def load_manifest(store_dir=STORE_DIR):
+    try:
+        with open(_manifest_path(store_dir), 'r') as f: manifest = json.load(f)
+    except Exception:
+        return _new_manifest()
+    if manifest.get("version") != MANIFEST_VERSION:
+        # 格式升级后全量重新摄入；generation 延续旧值，依赖它的快照/缓存一定失效
+        fresh = _new_manifest()
+        fresh['generation'] = manifest.get('generation', 0) + 1
+        return fresh
+    return manifest
+
+def _save_manifest(manifest, store_dir):
+    tmp = _manifest_path(store_dir) + ".tmp"
+    with open(tmp, 'w') as f: json.dump(manifest, f)
+    os.replace(tmp, _manifest_path(store_dir))
+
+def _write_segment(manifest, kind, df, store_dir, prefix="delta"):
+    segment = f"{prefix}-{manifest['next_seq']:06d}.parquet"
+    manifest['next_seq'] += 1
+    os.makedirs(os.path.join(store_dir, kind), exist_ok=True)
+    df.to_parquet(_segment_path(store_dir, kind, segment), index=False)
+    manifest['segments'][kind].append(segment)
+    return segment
+
+def _owners(manifest, kind):
+    """每个日期由哪个分段提供数据: {date: segment}"""
+    return {e['date']: e['segment'] for e in manifest['files'].values()
+            if e['kind'] == kind and e.get('segment')}
+
+def _in_range(date, start, end):
+    return (start is None or date >= start) and (end is None or date <= end)
+
+def _read_table(manifest, kind, store_dir, start=None, end=None):
+    """
+    读取 base + delta 分段，同一日期以 manifest 登记的分段为准；
+    给了日期范围 (含两端) 时只打开拥有该范围内日期的分段
+    """
+    owners = {d: s for d, s in _owners(manifest, kind).items() if _in_range(d, start, end)}
+    parts = []
+    for segment in manifest['segments'][kind]:
+        own_dates = [d for d, s in owners.items() if s == segment]
+        if not own_dates: continue
+        seg_df = pd.read_parquet(_segment_path(store_dir, kind, segment))
+        parts.append(seg_df[seg_df['Date'].isin(own_dates)])
+    if not parts: return _empty_table(kind)
+    return pd.concat(parts, ignore_index=True).sort_values('Date', kind='stable').reset_index(drop=True)
+
+def _is_delta(segment):
+    return segment.startswith("delta")
+
+def _compact(manifest, kind, store_dir):
+    """
+    把 delta 分段并入按月分区的 base 分段：只重写 delta 拥有日期的月份，
+    随后删除不再拥有任何日期的分段 (以及 manifest 里没有登记的旧分段文件)
+    """
+    owners = _owners(manifest, kind)
+    months = sorted({d[:7] for d, s in owners.items() if _is_delta(s)})
+    for month in months:
+        table = _read_table(manifest, kind, store_dir, f"{month}-01", f"{month}-31")
+        base = _write_segment(manifest, kind, table, store_dir, prefix=f"base-{month}")
+        for e in manifest['files'].values():
+            if e['kind'] == kind and e.get('segment') and e['date'][:7] == month: e['segment'] = base
+    live = set(_owners(manifest, kind).values())
+    manifest['segments'][kind] = [s for s in manifest['segments'][kind] if s in live]
+    kind_dir = os.path.join(store_dir, kind)
+    for segment in os.listdir(kind_dir) if os.path.isdir(kind_dir) else []:
+        if segment.endswith(".parquet") and segment not in live:
+            try: os.remove(_segment_path(store_dir, kind, segment))
+            except OSError: pass
+
+# --- 增量摄入 ---
+def _scan_changes(manifest, kind, data_dir):
+    """
+    返回 (需要解析的文件, 已消失的文件名)。
+    归档成员按文件名对应原来的条目，归档清单里记录了原始 mtime/size/sha1，打包进归档不会触发重新解析。
+    """
+    seen, changed = set(), []
+    for path in list_daily_files(kind, data_dir):
+        fname = os.path.basename(path)
+        seen.add(fname)
+        mtime, size, sha1 = daily_file_info(path, data_dir)
+        entry = manifest['files'].get(fname)
+        if entry and entry['mtime'] == mtime and entry['size'] == size: continue
+        sha1 = sha1 or _file_sha1(path)
+        if entry and entry['sha1'] == sha1:
+            # 仅时间戳变化 (例如重新 checkout)，内容未变，不重新解析
+            entry['mtime'], entry['size'] = mtime, size
+            continue
+        changed.append((path, {"kind": kind, "date": date_of(path), "mtime": mtime,
+                               "size": size, "sha1": sha1, "segment": None}))
+    removed = [f for f, e in manifest['files'].items() if e['kind'] == kind and f not in seen]
+    return changed, removed
+
+def _safe_parse(kind, path):
+    """线程/进程池里的解析+校验任务: (片段 或 None, 问题列表, 列名变体)，被隔离的文件片段为 None"""
+    return validate.parse_file(kind, path)
+
+def parse_files(jobs, max_workers=None, executor=None):
+    """
+    并行解析 [(kind, path), ...]，结果按输入顺序 (即日期顺序) 返回。
+    executor: "thread" (默认，pandas C 解析器会释放 GIL) 或 "process"；任务很少时直接串行。
+    """
+    max_workers = max_workers or MAX_WORKERS
+    executor = executor or PARSE_EXECUTOR
+    if max_workers <= 1 or len(jobs) < 4:
+        return [_safe_parse(kind, path) for kind, path in jobs]
+    pool_cls = ProcessPoolExecutor if executor == "process" else ThreadPoolExecutor
+    kinds, paths = zip(*jobs)
+    chunksize = max(1, len(jobs) // (max_workers * 4)) if executor == "process" else 1
+    with pool_cls(max_workers=max_workers) as pool:
+        return list(pool.map(_safe_parse, kinds, paths, chunksize=chunksize))
+
+def ingest(data_dir=DATA_DIR, store_dir=STORE_DIR, max_workers=None, executor=None):
+    """
+    把 daily_data 中新增/被替换的文件并入仓库，返回 {kind: [已摄入日期]}。
+    未变化的文件只做一次 stat，不会重新解析；需要解析的文件 (三类合并) 交给有界的线程池。
+    """
+    with _LOCK:
+        fps = file_fingerprints(data_dir)
+        # 快速路径：目录指纹与上次一致时无需读 manifest、逐个 stat
+        if _FINGERPRINTS.get((data_dir, store_dir)) == fps and os.path.exists(_manifest_path(store_dir)):
+            return {kind: [] for kind in KINDS}
+        # 写仓库前取得跨进程的文件锁，并在锁内重新读取 manifest (其他进程可能刚摄入过)
+        with store_lock(store_dir):
+            manifest = load_manifest(store_dir)
+            summary, dirty = {}, False
+            changes = {}
+            for kind in KINDS:
+                changed, removed = _scan_changes(manifest, kind, data_dir)
+                for fname in removed: del manifest['files'][fname]
+                changes[kind] = changed
+                if changed or removed:
+                    dirty = True
+                    _CACHE.discard(lambda key, kind=kind: key[1:3] == (store_dir, kind))
+
+            jobs = [(kind, path) for kind in KINDS for path, _ in changes[kind]]
+            results = iter(parse_files(jobs, max_workers, executor))
+            for kind in KINDS:
+                parts = []
+                for path, entry in changes[kind]:
+                    part, issues, variant = next(results)
+                    entry['segment'] = None if part is None else True
+                    if issues: entry['issues'] = issues
+                    if variant: entry['schema'] = variant
+                    if part is not None: parts.append(part)
+                    manifest['files'][os.path.basename(path)] = entry
+                if parts:
+                    # 按月份各写一个 delta，保证每个分段只覆盖一个月
+                    new = pd.concat(parts, ignore_index=True)
+                    segments = {month: _write_segment(manifest, kind, part, store_dir)
+                                for month, part in new.groupby(new['Date'].str[:7], sort=True)}
+                    for _, entry in changes[kind]:
+                        if entry['segment'] is True: entry['segment'] = segments[entry['date'][:7]]
+                summary[kind] = sorted(entry['date'] for _, entry in changes[kind] if entry['segment'])
+                if sum(map(_is_delta, manifest['segments'][kind])) > MAX_DELTA_SEGMENTS:
+                    _compact(manifest, kind, store_dir)
+                    dirty = True
+            if dirty or not os.path.exists(_manifest_path(store_dir)):
+                manifest['generation'] += 1
+                _save_manifest(manifest, store_dir)
+            _FINGERPRINTS[(data_dir, store_dir)] = fps
+            if dirty:
+                # 对新增日期做异常检测 (anomalies 依赖本模块，延迟导入)，再重写校验报告。
+                # 检测结果读写失败不影响摄入 (读取结果时会重试)，但要发出警告并记进报告；其他异常照常抛出
+                import anomalies
+                errors = {}
+                try: anomalies.update(data_dir, store_dir)
+                except (OSError, ValueError) as e:
+                    warnings.warn(f"anomalies: detection failed for {store_dir}: {e}", RuntimeWarning)
+                    errors["anomalies"] = f"{type(e).__name__}: {e}"
+                series = {kind: validate.series_issues(compact_history(kind, data_dir, store_dir)) for kind in ("songs", "albums")}
+                validate.write_report(manifest, series, store_dir, errors)
+                # 单曲身份索引 (改名/乱码合并) 同样在摄入时重建落盘
+                import song_index
+                song_index.update(data_dir, store_dir)
+            return summary
+
+def build_store(data_dir=DATA_DIR, store_dir=STORE_DIR):
+    """全量重建仓库：清空 manifest 后重新摄入，并合并为按月分区的 base 分段"""
+    with store_lock(store_dir):
+        os.makedirs(store_dir, exist_ok=True)
+        # generation 延续旧值，保证依赖它的快照/缓存一定失效
+        generation = load_manifest(store_dir)['generation']
+        manifest = _new_manifest()
+        manifest['generation'] = generation + 1
+        for kind in KINDS:
+            old_dir = os.path.join(store_dir, kind)
+            if os.path.isdir(old_dir):
+                for f in os.listdir(old_dir): os.remove(os.path.join(old_dir, f))
+        _save_manifest(manifest, store_dir)
+        clear_caches()
+        ingest(data_dir, store_dir)
+        manifest = load_manifest(store_dir)
+        for kind in KINDS: _compact(manifest, kind, store_dir)
+        manifest['generation'] += 1
+        _save_manifest(manifest, store_dir)
+
+def clear_caches():
+    """清空进程内的长表/宽表/单曲历史缓存和目录指纹 (基准测试冷启动用)"""
+    with _LOCK:
+        _FINGERPRINTS.clear()
+        _CACHE.discard(lambda key: key[0] in ("table", "compact", "item", "anomalies", "identity"))
+
+def ensure_store(data_dir=DATA_DIR, store_dir=STORE_DIR):
+    ingest(data_dir, store_dir)
+
+def fingerprint(kind, data_dir=DATA_DIR, store_dir=STORE_DIR):
+    """某类文件的当前指纹 (会先增量摄入新文件)，用作缓存键"""
+    with _LOCK:
+        ensure_store(data_dir, store_dir)
+        return _FINGERPRINTS[(data_dir, store_dir)][kind]
+
+def load_table(kind, data_dir=DATA_DIR, store_dir=STORE_DIR):
+    """读取某类长表 (会先增量摄入新文件)；文件指纹未变化时直接复用进程内缓存"""
+    with _LOCK:
+        fp = fingerprint(kind, data_dir, store_dir)
+        cached = _CACHE.get(("table", store_dir, kind), fp)
+        if cached is not None: return cached
+        return _CACHE.put(("table", store_dir, kind), fp, _compact_table(_read_table(load_manifest(store_dir), kind, store_dir)))
+
+def load_range(kind, start=None, end=None, data_dir=DATA_DIR, store_dir=STORE_DIR):
+    """
+    [start, end] (含两端，YYYY-MM-DD) 的长表，只读取覆盖该范围的月度分段，不进缓存；
+    整张长表已在缓存中时直接从中切片。
+    """
+    with _LOCK:
+        fp = fingerprint(kind, data_dir, store_dir)
+        table = _CACHE.get(("table", store_dir, kind), fp)
+        if table is not None: return _slice_dates(table, start, end)
+        return _compact_table(_read_table(load_manifest(store_dir), kind, store_dir, start, end))
+
+def _slice_dates(table, start, end):
+    """缓存中的长表按日期范围切片；meta 表没有经过 _compact_table，Date 仍是字符串列"""
+    if not isinstance(table['Date'].dtype, pd.CategoricalDtype):
+        return table[table['Date'].between(start or "", end or "\uffff")]
+    # 类别 (日期字符串) 已排序，范围对应一段连续的编码
+    dates, codes = table['Date'].cat.categories, table['Date'].cat.codes.to_numpy()
+    lo = dates.searchsorted(start) if start else 0
+    hi = dates.searchsorted(end, side='right') if end else len(dates)
+    return table[(codes >= lo) & (codes < hi)]
+
+def segment_plan(kind, start=None, end=None, data_dir=DATA_DIR, store_dir=STORE_DIR):
+    """
+    读取 [start, end] (含两端，YYYY-MM-DD) 需要的分段: [(分段文件路径, 该分段负责的日期 (升序))]，按首个日期排序。
+    只看 manifest，不读取分段内容 (供 export 等流式读取使用)。
+    """
+    ensure_store(data_dir, store_dir)
+    by_segment = {}
+    for date, segment in sorted(_owners(load_manifest(store_dir), kind).items()):
+        if (start is None or date >= start) and (end is None or date <= end):
+            by_segment.setdefault(segment, []).append(date)
+    return sorted(((_segment_path(store_dir, kind, seg), dates) for seg, dates in by_segment.items()), key=lambda x: x[1][0])
+
+def _compact_table(df):
+    """长表的 Date / Name 列转为 categorical：每个名称只存一份字符串，行里只有整数编码"""
+    if 'Name' not in df.columns: return df
+    return df.assign(Date=df['Date'].astype('category'), Name=df['Name'].astype('category'))
+
+def generation(store_dir=STORE_DIR):
+    """当前 manifest generation (缓存键)"""
+    return load_manifest(store_dir)['generation']
+
+def latest_date(kind="songs", data_dir=DATA_DIR, store_dir=STORE_DIR):
+    """某类通过校验 (已入库) 的最新日期；没有时为 None"""
+    ensure_store(data_dir, store_dir)
+    dates = _owners(load_manifest(store_dir), kind)
+    return max(dates) if dates else None
+
+def day_table(kind, date, data_dir=DATA_DIR, store_dir=STORE_DIR):
+    """
+    某一天的规范化条目表，列名同 data_utils.KEEP_COLUMNS ([Song, Streams_Num, Daily_Num] / [Base_Name, Total_Num, Daily_Num])，
+    行顺序与原始文件一致；当天没有入库的文件时为空表
+    """
+    day = load_range(kind, date, date, data_dir, store_dir)
+    name_col, total_col, daily_col = KEEP_COLUMNS[kind]
+    return pd.DataFrame({name_col: day['Name'].astype(str).to_numpy(), total_col: day['Streams'].to_numpy(dtype='int64'),
+                         daily_col: day['Daily'].to_numpy(dtype='int64')})
+
+def day_meta(date, data_dir=DATA_DIR, store_dir=STORE_DIR):
+    """某一天的 meta 字段 {field: int}；当天没有入库的 meta 文件时为空 dict"""
+    rows = load_range("meta", date, date, data_dir, store_dir)
+    if rows.empty: return {}
+    return {k: int(v) for k, v in rows.iloc[-1][list(META_FIELDS)].items()}
+
+def _build_compact(table):
+    d_codes, dates = pd.factorize(table['Date'], sort=True)
+    n_codes, names = pd.factorize(table['Name'], sort=True)
+    shape = (len(dates), len(names))
+    present = np.zeros(shape, dtype=bool)
+    present[d_codes, n_codes] = True
+    arrays = {}
+    for col in ('Daily', 'Streams'):
+        values = np.zeros(shape, dtype='int64')
+        values[d_codes, n_codes] = table[col].to_numpy(dtype='int64')
+        arrays[col] = values
+    return {
+        "dates": np.asarray(dates, dtype='datetime64[D]'),
+        "names": pd.Index(names, name='Name'),
+        "Daily": arrays['Daily'],
+        "Streams": arrays['Streams'],
+        "present": present,
+    }
+
+def compact_history(kind, data_dir=DATA_DIR, store_dir=STORE_DIR):
+    """
+    songs/albums 历史的紧凑表示，按文件指纹缓存 (长表本身读完即丢，不常驻内存):
+      dates   datetime64[D] 日期索引 (升序)
+      names   名称字典 (pd.Index，字母序；列号即编码)
+      Daily / Streams   int64[日期 × 名称]
+      present bool[日期 × 名称]，当天文件里有这一条目
+    """
+    with _LOCK:
+        fp = fingerprint(kind, data_dir, store_dir)
+        cached = _CACHE.get(("compact", store_dir, kind), fp)
+        if cached is not None: return cached
+        table = _read_table(load_manifest(store_dir), kind, store_dir)
+        return _CACHE.put(("compact", store_dir, kind), fp, _build_compact(table))
+
+def footprint(compact):
+    """紧凑历史各部分占用的字节数"""
+    sizes = {k: int(v.memory_usage(deep=True)) if isinstance(v, pd.Index) else int(v.nbytes) for k, v in compact.items()}
+    sizes["total"] = sum(sizes.values())
+    return sizes
+
+def memory_report(data_dir=DATA_DIR, store_dir=STORE_DIR):
+    """songs/albums 紧凑历史的规模与内存占用: DataFrame[Kind, Days, Items, *_MB, Total_MB]"""
+    rows = []
+    for kind in ("songs", "albums"):
+        compact = compact_history(kind, data_dir, store_dir)
+        sizes = footprint(compact)
+        rows.append({"Kind": kind, "Days": len(compact["dates"]), "Items": len(compact["names"]),
+                     **{f"{k}_MB": v / 2**20 for k, v in sizes.items() if k != "total"}, "Total_MB": sizes["total"] / 2**20})
+    return pd.DataFrame(rows)
+
+def history_matrix(kind, value='Daily', data_dir=DATA_DIR, store_dir=STORE_DIR):
+    """
+    日期 × 名称 的宽表视图 (缺失为 NaN，float64)，由紧凑历史即时展开，不单独缓存。
+    """
+    compact = compact_history(kind, data_dir, store_dir)
+    values = np.where(compact["present"], compact[value], np.nan)
+    index = pd.Index(np.datetime_as_string(compact["dates"], unit='D').astype(object), name='Date')
+    return pd.DataFrame(values, index=index, columns=compact["names"])
+
+def identity_generation(kind, data_dir=DATA_DIR, store_dir=STORE_DIR):
+    """identity_history 的缓存 generation (songs 还包含人工覆盖文件)"""
+    if kind != "songs": return fingerprint(kind, data_dir, store_dir)
+    import song_index
+    return song_index.generation(data_dir, store_dir)
+
+def identity_history(kind, data_dir=DATA_DIR, store_dir=STORE_DIR):
+    """
+    songs 为按身份索引 (song_index) 合并了改名/乱码写法的紧凑历史，名称为当前写法；albums 即 compact_history
+    """
+    if kind != "songs": return compact_history(kind, data_dir, store_dir)
+    import song_index
+    return song_index.merged_history(data_dir, store_dir)
+
+# --- 日历对齐：按真实日期而不是"上一个文件"做差 ---
+def calendar_rows(dates):
+    """
+    把升序的上传日映射到连续日历: 返回 (日历 datetime64[D] 数组, 每个日历日对应的上传行号)，
+    没有上传文件的日期 (断档) 行号为 -1。
+    """
+    dates = np.asarray(dates, dtype='datetime64[D]')
+    if not len(dates): return dates, np.zeros(0, dtype='int64')
+    calendar = np.arange(dates[0], dates[-1] + 1, dtype='datetime64[D]')
+    rows = np.full(len(calendar), -1, dtype='int64')
+    rows[(dates - dates[0]).astype('int64')] = np.arange(len(dates))
+    return calendar, rows
+
+def calendar_matrix(kind, value='Daily', data_dir=DATA_DIR, store_dir=STORE_DIR):
+    """日历对齐的 日期 × 名称 宽表：断档日期整行为 NaN，attrs['gaps'] 列出这些日期"""
+    compact = compact_history(kind, data_dir, store_dir)
+    calendar, rows = calendar_rows(compact["dates"])
+    values = np.full((len(calendar), len(compact["names"])), np.nan)
+    values[rows >= 0] = np.where(compact["present"], compact[value], np.nan)
+    labels = np.datetime_as_string(calendar, unit='D').astype(object)
+    matrix = pd.DataFrame(values, index=pd.Index(labels, name='Date'), columns=compact["names"])
+    matrix.attrs['gaps'] = list(labels[rows < 0])
+    return matrix
+
+def delta_matrix(kind, lag=1, value='Daily', data_dir=DATA_DIR, store_dir=STORE_DIR):
+    """所有条目、所有日期相对 lag 个日历日之前的差；任一端是断档或缺失时为 NaN"""
+    matrix = calendar_matrix(kind, value, data_dir, store_dir)
+    return matrix - matrix.shift(lag)
+
+def lag_deltas(kind, lags=(1, 7), value='Daily', at=None, data_dir=DATA_DIR, store_dir=STORE_DIR):
+    """
+    某个上传日 (默认最新) 所有条目相对 at - lag 天的变化: DataFrame(index=Name)[value, Prev_k, Change_k, Gap_k]。
+    Gap_k=True 表示 at - k 那天没有上传文件，此时 Prev_k / Change_k 为 NaN；
+    那天有文件但没有该条目 (新上榜) 时 Prev_k 记为 0。当天文件中没有的条目 value 为 NaN。
+    songs 按身份合并 (identity_history)，改名当天也能接上前一天的旧名。
+    """
+    compact = identity_history(kind, data_dir, store_dir)
+    dates, names = compact["dates"], compact["names"]
+    values, present = compact[value], compact["present"]
+    if not len(dates): return pd.DataFrame(index=names)
+    t = len(dates) - 1 if at is None else int(np.searchsorted(dates, np.datetime64(at, 'D')))
+    if t >= len(dates) or (at is not None and dates[t] != np.datetime64(at, 'D')):
+        raise KeyError(f"no {kind} upload on {at}")
+    current = np.where(present[t], values[t], np.nan)
+    out = {value: current}
+    for lag in lags:
+        target = dates[t] - np.timedelta64(lag, 'D')
+        j = int(np.searchsorted(dates, target))
+        if j < len(dates) and dates[j] == target:
+            prev = np.where(present[j], values[j], 0).astype('float64')
+            out[f"Prev_{lag}"], out[f"Change_{lag}"], out[f"Gap_{lag}"] = prev, current - prev, False
+        else:
+            out[f"Prev_{lag}"] = out[f"Change_{lag}"] = np.full(len(names), np.nan)
+            out[f"Gap_{lag}"] = True
+    result = pd.DataFrame(out, index=names)
+    result.attrs['date'] = str(dates[t])
+    return result
+
+# --- 查询接口 (供 app.py 的历史函数使用) ---
+def item_history(item_name, is_album=False, data_dir=DATA_DIR, store_dir=STORE_DIR):
+    """
+    单曲/专辑每日增量历史: DataFrame[Date, Daily]；结果进有界 LRU，同类文件变化时失效。
+    单曲可用任意写法 (旧名、乱码) 查询，返回合并后的整段历史。
+    """
+    kind = "albums" if is_album else "songs"
+    with _LOCK:
+        gen = identity_generation(kind, data_dir, store_dir)
+        cached = _CACHE.get(("item", store_dir, kind, item_name), gen)
+        if cached is not None: return cached
+        compact = identity_history(kind, data_dir, store_dir)
+        name = item_name
+        if not is_album:
+            import song_index
+            name = song_index.resolve(item_name, data_dir, store_dir) or item_name
+        j = compact["names"].get_indexer([name])[0]
+        if j < 0: return pd.DataFrame(columns=['Date', 'Daily'])
+        rows = compact["present"][:, j]
+        hist = pd.DataFrame({'Date': np.datetime_as_string(compact["dates"][rows], unit='D').astype(object),
+                             'Daily': compact["Daily"][rows, j]})
+        return _CACHE.put(("item", store_dir, kind, item_name), gen, hist)
+
+def career_history(data_dir=DATA_DIR, store_dir=STORE_DIR):
+    """
+    生涯日增趋势: DataFrame[Date, Daily, Estimated, Outlier]。
+    相邻两次上传的 career_total 之差按日历天均分 (断档不再形成两天累积的尖峰)，
+    非正增长和远超近期水平的错误值被剔除；结果由 anomalies.py 在摄入时算好并落盘。
+    """
+    import anomalies
+    return anomalies.career_history(data_dir, store_dir)
+
+def listeners_history(data_dir=DATA_DIR, store_dir=STORE_DIR):
+    meta = load_table("meta", data_dir, store_dir)
+    hist = meta.loc[meta['listeners'] > 0, ['Date', 'listeners']].rename(columns={'listeners': 'Listeners'})
+    if hist.empty: return pd.DataFrame()
+    return hist.reset_index(drop=True)
+
+if __name__ == "__main__":
+    # 每日上传后运行: python history_store.py
+    for kind, dates in ingest().items():
+        print(f"{kind}: ingested {len(dates)} day(s) {', '.join(dates)}")
@@ -0,0 +1,132 @@
+"""
+并发会话负载测试：在同一进程里用 streamlit.testing 的 AppTest 模拟 N 个同时打开看板的会话，
+每个会话先加载页面，再重复 rerun (相当于切换控件)，统计每次渲染 (整个脚本执行 + 元素序列化) 的延迟分布。
+会话共用同一个 dashboard_service：报告里的 builds 是这一轮看板状态被构建的次数，
+waits 是共享缓存里等待他人正在进行的同一次构建 (看板状态、图表) 的次数。
+
+    python loadtest.py                          # 1, 8, 32 个并发会话，每个 3 次渲染
+    python loadtest.py --sessions 64 --runs 5 --cold
+    python loadtest.py --json load.json         # 结果另存 JSON，便于对比回归
+
+--cold: 每一轮之前清空进程内缓存 (看板状态、长表、图表)，模拟上传新数据后 (例如专辑发行日) 第一波同时涌入的访问。
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+import charts
+import dashboard_service
+import history_store
+import rolling_stats
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+PERCENTILES = (50, 90, 99)
+
+def clear_caches():
+    dashboard_service.clear()
+    history_store.clear_caches()
+    rolling_stats.clear_caches()
+    charts.clear()
+
+def _share_test_runtime():
+    """
+    AppTest 每次 run 都把全局 Runtime 设为自己的 mock，结束时再置空，并发的会话会互相清掉对方的 Runtime。
+    这里让 Runtime.instance() 在被置空后沿用最近一次设置的 mock (只影响本进程的测试会话)。
+    """
+    from streamlit.runtime import Runtime
+    last = {}
+
+    def instance(cls):
+        if cls._instance is not None: last['runtime'] = cls._instance
+        if 'runtime' not in last: raise RuntimeError("Runtime hasn't been created!")
+        return last['runtime']
+
+    Runtime.instance = classmethod(instance)
+    Runtime.exists = classmethod(lambda cls: cls._instance is not None or 'runtime' in last)
+
+def _share_script_cache():
+    """
+    与 streamlit 服务器一样所有会话共用一份脚本字节码缓存 (AppTest 每次 run 各建一份)；
+    编译时加锁 (Python 3.11 的 ast.parse 在多线程同时编译时可能报 SystemError)
+    """
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    shared, lock, get_bytecode = ScriptCache(), threading.Lock(), ScriptCache.get_bytecode
+
+    def shared_bytecode(self, script_path):
+        with lock: return get_bytecode(shared, script_path)
+
+    ScriptCache.get_bytecode = shared_bytecode
+
+def _session(app_path, runs, timeout, start):
+    """一个会话: 等所有会话就绪后同时开始，返回 (每次渲染的秒数, 脚本异常数)"""
+    from streamlit.testing.v1 import AppTest
+    at = AppTest.from_file(app_path, default_timeout=timeout)
+    start.wait()
+    latencies = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        at.run()
+        latencies.append(time.perf_counter() - t0)
+    return latencies, len(at.exception)
+
+def run_level(sessions, runs=3, cold=False, app_path=APP_PATH, timeout=120):
+    """N 个并发会话各渲染 runs 次，返回 {sessions, renders, p50_ms, p90_ms, p99_ms, max_ms, first_p50_ms, first_p99_ms, renders_per_s, ...}"""
+    if cold: clear_caches()
+    before = dashboard_service.stats()
+    start = threading.Barrier(sessions + 1)
+    with ThreadPoolExecutor(max_workers=sessions) as pool:
+        futures = [pool.submit(_session, app_path, runs, timeout, start) for _ in range(sessions)]
+        start.wait()
+        t0 = time.perf_counter()
+        results = [f.result() for f in futures]
+        wall = time.perf_counter() - t0
+    after = dashboard_service.stats()
+    all_ms = np.array([x for lat, _ in results for x in lat]) * 1000
+    first_ms = np.array([lat[0] for lat, _ in results]) * 1000
+    row = {"sessions": sessions, "renders": len(all_ms), "cold": cold}
+    row.update({f"p{p}_ms": round(float(np.percentile(all_ms, p)), 1) for p in PERCENTILES})
+    row["max_ms"] = round(float(all_ms.max()), 1)
+    row.update({f"first_p{p}_ms": round(float(np.percentile(first_ms, p)), 1) for p in (50, 99)})
+    row["renders_per_s"] = round(len(all_ms) / wall, 2)
+    row.update({k: after[k] - before[k] for k in ("builds", "waits")})
+    row["errors"] = sum(n for _, n in results)
+    return row
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulate concurrent dashboard sessions and report render latency.")
+    parser.add_argument("--sessions", default="1,8,32", help="comma-separated concurrency levels")
+    parser.add_argument("--runs", type=int, default=3, help="renders per session (first is the page load)")
+    parser.add_argument("--cold", action="store_true", help="clear in-process caches before each level")
+    parser.add_argument("--app", default=APP_PATH)
+    parser.add_argument("--timeout", type=float, default=120, help="per-render timeout in seconds")
+    parser.add_argument("--json", default=None, help="write results to this JSON file")
+    args = parser.parse_args(argv)
+    # st.dataframe(use_container_width=...) 等弃用提示每次渲染都会打印
+    warnings.filterwarnings("ignore")
+    _share_test_runtime()
+    _share_script_cache()
+
+    # 预热: 编译脚本、导入 plotly 等一次性开销不计入任何一轮
+    run_level(1, 1, False, args.app, args.timeout)
+    results = []
+    print(f"{'sessions':>8} {'renders':>8} {'p50':>8} {'p90':>8} {'p99':>8} {'max':>8} {'load p50':>9} {'load p99':>9} "
+          f"{'renders/s':>10} {'builds':>7} {'waits':>6} {'errors':>7}")
+    for n in [int(x) for x in args.sessions.split(",") if x.strip()]:
+        row = run_level(n, args.runs, args.cold, args.app, args.timeout)
+        results.append(row)
+        print(f"{n:>8} {row['renders']:>8} {row['p50_ms']:>8.0f} {row['p90_ms']:>8.0f} {row['p99_ms']:>8.0f} {row['max_ms']:>8.0f} "
+              f"{row['first_p50_ms']:>9.0f} {row['first_p99_ms']:>9.0f} {row['renders_per_s']:>10.1f} "
+              f"{row['builds']:>7} {row['waits']:>6} {row['errors']:>7}", flush=True)
+    print("latency in ms; 'load' = first render of each session")
+    if args.json:
+        with open(args.json, 'w') as f: json.dump(results, f, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
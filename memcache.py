@@ -0,0 +1,127 @@
+"""
+进程内共享缓存：所有艺人的长表、宽表、滚动统计共用一个按字节数限额的 LRU。
+每个条目带 manifest generation，generation 变化即视为失效；超出限额时淘汰最久未用的条目，
+所以多追踪一位艺人只会挤掉冷数据，而不会让内存成倍增长。
+
+限额默认 512MB，可用环境变量 ARI_CACHE_MB 调整。
+"""
+import os
+import sys
+import threading
+from collections import OrderedDict
+from collections.abc import Mapping
+import numpy as np
+import pandas as pd
+
+DEFAULT_MAX_MB = float(os.environ.get("ARI_CACHE_MB", 512))
+
+def nbytes(value):
+    """估算缓存对象占用的字节数 (DataFrame/Series 含字符串内容)"""
+    if isinstance(value, pd.DataFrame): return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, (pd.Series, pd.Index)): return int(value.memory_usage(deep=True))
+    if isinstance(value, np.ndarray): return int(value.nbytes)
+    if isinstance(value, (tuple, list)): return sum(nbytes(v) for v in value)
+    if isinstance(value, Mapping): return sum(nbytes(v) for v in value.values())
+    return sys.getsizeof(value)
+
+class BoundedCache:
+    """{key: (generation, value)}，按总字节数做 LRU 淘汰"""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = int(max_bytes)
+        self._lock = threading.RLock()
+        self._items = OrderedDict()  # key -> (generation, value, size)
+        self._bytes = 0
+        # (key, generation) -> 正在进行的构建 {"done", "value", "error"}
+        self._flights = {}
+        self.hits = self.misses = self.evictions = self.waits = 0
+
+    def get(self, key, generation=None):
+        """命中且 generation 一致时返回值，否则返回 None"""
+        with self._lock:
+            item = self._items.get(key)
+            if item is None or (generation is not None and item[0] != generation):
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def put(self, key, generation, value, size=None):
+        size = nbytes(value) if size is None else size
+        with self._lock:
+            self._discard(key)
+            # 单个条目超过总限额时不缓存，避免把其他艺人全部挤出
+            if size > self.max_bytes: return value
+            self._items[key] = (generation, value, size)
+            self._bytes += size
+            self._evict()
+            return value
+
+    def get_or_build(self, key, generation, build, size=None):
+        """
+        命中时直接返回，否则调用 build() 并放入缓存 (返回 None 时不缓存)；size 可以是字节数或 size(value) 函数。
+        同一 (key, generation) 同时只有一个线程在构建，其余线程等待并共用它的结果或异常 (单飞)，
+        高峰期大量会话同时未命中时只算一次。
+        """
+        with self._lock:
+            value = self.get(key, generation)
+            if value is not None: return value
+            flight = self._flights.get((key, generation))
+            leader = flight is None
+            if leader: flight = self._flights[(key, generation)] = {"done": threading.Event(), "value": None, "error": None}
+            else: self.waits += 1
+        if not leader:
+            flight["done"].wait()
+            if flight["error"] is not None: raise flight["error"]
+            return flight["value"]
+        try:
+            value = build()
+            if value is not None: self.put(key, generation, value, size(value) if callable(size) else size)
+            flight["value"] = value
+        except BaseException as e:
+            flight["error"] = e
+            raise
+        finally:
+            with self._lock: self._flights.pop((key, generation), None)
+            flight["done"].set()
+        return value
+
+    def _evict(self):
+        while self._bytes > self.max_bytes and self._items:
+            _, (_, _, size) = self._items.popitem(last=False)
+            self._bytes -= size
+            self.evictions += 1
+
+    def _discard(self, key):
+        item = self._items.pop(key, None)
+        if item is not None: self._bytes -= item[2]
+
+    def discard(self, predicate):
+        """删除所有 predicate(key) 为真的条目"""
+        with self._lock:
+            for key in [k for k in self._items if predicate(k)]: self._discard(key)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self._bytes = 0
+
+    def resize(self, max_bytes):
+        with self._lock:
+            self.max_bytes = int(max_bytes)
+            self._evict()
+
+    def report(self):
+        """各缓存条目占用: DataFrame[Key, MB]，按最近使用排序 (最旧在前)"""
+        with self._lock:
+            rows = [{"Key": " / ".join(map(str, key)), "MB": size / 2**20} for key, (_, _, size) in self._items.items()]
+        return pd.DataFrame(rows, columns=["Key", "MB"])
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._items), "bytes": self._bytes, "max_bytes": self.max_bytes,
+                    "hits": self.hits, "misses": self.misses, "evictions": self.evictions, "waits": self.waits}
+
+# 全进程唯一实例：history_store / rolling_stats 等都往这里放
+SHARED = BoundedCache(DEFAULT_MAX_MB * 2**20)
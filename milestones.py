@@ -0,0 +1,66 @@
+"""
+里程碑预测：输入总播放量数组和日增速度数组，一次性 (NumPy 向量化) 计算
+下一个里程碑、差距、所需天数和预计达成日期，可同时投影多个档位 (100M / 1B / 自定义列表)。
+"""
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+MILESTONE_100M = 100_000_000
+MILESTONE_1B = 1_000_000_000
+# 超过此天数的 ETA 视为不可预测 (接近 pd.Timedelta 上限，避免溢出)
+MAX_ETA_DAYS = 100_000
+
+def next_milestones(totals, step=None, thresholds=None):
+    """
+    下一个里程碑。step 模式: ((total // step) + 1) * step；
+    thresholds 模式: 严格大于 total 的最小阈值，超出最后一个阈值时为 NA。
+    """
+    totals = np.asarray(totals, dtype='int64')
+    if thresholds is None:
+        return pd.array((totals // step + 1) * step, dtype='Int64')
+    thresholds = np.sort(np.asarray(thresholds, dtype='int64'))
+    pos = np.searchsorted(thresholds, totals, side='right')
+    found = pos < len(thresholds)
+    result = pd.array(np.where(found, thresholds[np.minimum(pos, len(thresholds) - 1)], 0), dtype='Int64')
+    result[~found] = pd.NA
+    return result
+
+def project_milestones(totals, speeds, step=MILESTONE_1B, thresholds=None, now=None, index=None):
+    """
+    返回 DataFrame[Total, Speed, Milestone, Remaining, Days, ETA, ETA_Str]。
+    speed <= 0 时 Days 为 inf、ETA 为 NaT、ETA_Str 为 "Unknown"。
+    """
+    totals = np.asarray(totals, dtype='int64')
+    speeds = np.asarray(speeds, dtype='float64')
+    milestone = next_milestones(totals, step, thresholds)
+    remaining = milestone - totals
+    gap = remaining.to_numpy(dtype='float64', na_value=np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        days = np.where(speeds > 0, gap / np.where(speeds > 0, speeds, 1), np.inf)
+    days = np.where(np.isnan(gap), np.nan, days)
+
+    now = np.datetime64(now or datetime.now(), 's')
+    reachable = np.isfinite(days) & (days < MAX_ETA_DAYS)
+    seconds = np.where(reachable, days * 86400, 0).astype('int64')
+    eta = np.where(reachable, now + seconds.astype('timedelta64[s]'), np.datetime64('NaT'))
+    eta_str = np.where(reachable, np.datetime_as_string(eta, unit='D'), "Unknown")
+
+    return pd.DataFrame({
+        'Total': totals, 'Speed': speeds, 'Milestone': milestone, 'Remaining': remaining,
+        'Days': days, 'ETA': eta, 'ETA_Str': eta_str,
+    }, index=index)
+
+def project_tiers(totals, speeds, steps=(MILESTONE_100M, MILESTONE_1B), now=None, index=None):
+    """同时投影多个档位，返回以档位为第一层列索引的 DataFrame"""
+    now = now or datetime.now()
+    return pd.concat({step: project_milestones(totals, speeds, step=step, now=now, index=index)
+                      for step in steps}, axis=1)
+
+def milestone_labels(projection, max_days=3650):
+    """单曲总榜的 Next_Milestone 文本: "差距" 或 "差距 (Need N Days)" """
+    gap_str = projection['Remaining'].map('{:,}'.format)
+    days = projection['Days']
+    need = days.notna() & (days < max_days)
+    need_str = " (Need " + days.where(need, 0).astype('int64').astype(str) + " Days)"
+    return gap_str.where(~need, gap_str + need_str)
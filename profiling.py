@@ -0,0 +1,84 @@
+"""
+分段计时：记录 app.py 每次渲染中各区块的耗时。
+默认关闭；设置环境变量 ARI_PROFILE=1 时所有渲染都开启，或由 start_run(True) 只开启本次渲染 (页面 URL 加 ?profile=1)。
+ARI_PROFILE_LOG=<path> 时每次渲染追加一行 JSON，便于离线对比。
+
+用法 (脚本式逐段打点，无需改缩进):
+    profiling.start_run()
+    ...                       # 区块 A
+    profiling.lap("header")
+    ...                       # 区块 B
+    profiling.lap("crystal_ball")
+    profiling.finish_run()
+"""
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager
+import pandas as pd
+
+# 唯一的全局开关 (只读)：由环境变量决定；按请求开启走 start_run(True)
+ENABLED = os.environ.get("ARI_PROFILE", "") not in ("", "0")
+LOG_PATH = os.environ.get("ARI_PROFILE_LOG")
+
+_LOCK = threading.Lock()
+# 进程内累计: {section: [count, total_s, max_s, last_s]}
+_STATS = {}
+_local = threading.local()
+
+def _record(name, seconds):
+    with _LOCK:
+        s = _STATS.setdefault(name, [0, 0.0, 0.0, 0.0])
+        s[0] += 1; s[1] += seconds; s[2] = max(s[2], seconds); s[3] = seconds
+    run = getattr(_local, "run", None)
+    if run is not None: run["sections"][name] = run["sections"].get(name, 0.0) + seconds
+
+def start_run(enabled=None):
+    """开始本线程的一次渲染计时；enabled 为 None 时取 ENABLED。未开启时本次的 lap/finish_run 什么也不做"""
+    if not (ENABLED if enabled is None else enabled):
+        _local.run = None
+        return
+    now = time.perf_counter()
+    _local.run = {"start": now, "last": now, "sections": {}}
+
+def lap(name):
+    """记录上一个打点到现在的耗时"""
+    run = getattr(_local, "run", None)
+    if run is None: return
+    now = time.perf_counter()
+    _record(name, now - run["last"])
+    run["last"] = now
+
+def finish_run():
+    """结束本次渲染，返回 {section: 秒}；开启日志时追加写入"""
+    run = getattr(_local, "run", None)
+    if run is None: return {}
+    _local.run = None
+    total = time.perf_counter() - run["start"]
+    _record("total", total)
+    sections = dict(run["sections"], total=total)
+    if LOG_PATH:
+        with _LOCK, open(LOG_PATH, "a") as f:
+            f.write(json.dumps({"ts": time.time(), "sections": sections}) + "\n")
+    return sections
+
+@contextmanager
+def section(name):
+    """非脚本场景下的计时块"""
+    if not ENABLED:
+        yield
+        return
+    t0 = time.perf_counter()
+    try: yield
+    finally: _record(name, time.perf_counter() - t0)
+
+def report():
+    """各区块累计耗时 (毫秒)"""
+    with _LOCK:
+        rows = [{"Section": k, "Runs": c, "Mean_ms": tot / c * 1000, "Max_ms": mx * 1000, "Last_ms": last * 1000}
+                for k, (c, tot, mx, last) in _STATS.items()]
+    return pd.DataFrame(rows, columns=["Section", "Runs", "Mean_ms", "Max_ms", "Last_ms"])
+
+def reset():
+    with _LOCK: _STATS.clear()
@@ -0,0 +1,77 @@
+"""
+滚动统计引擎：在 history_store 的 日期 × 名称 宽表上，一次向量化计算所有单曲/专辑的
+N 日均值、中位数和 EWMA，取代逐曲/逐专辑重复读取最近 7 个文件。
+窗口按"最近 N 个数据文件"计 (与旧版 files[-7:] 一致)。
+"""
+import warnings
+import numpy as np
+import pandas as pd
+
+import history_store
+import memcache
+from data_utils import DATA_DIR
+
+DEFAULT_WINDOWS = (3, 7, 14, 30)
+DEFAULT_STATS = ("mean", "median")
+
+# 结果放在共享有界缓存中: ("stats", store_dir, kind, windows, stats, ewm_spans, positive_only) -> (文件指纹, DataFrame)
+_CACHE = memcache.SHARED
+
+def rolling_stats(matrix, windows=(7,), stats=("mean",), ewm_spans=(), positive_only=False):
+    """
+    对宽表最后 N 行做整列统计，返回以 Name 为索引的 DataFrame，
+    列名形如 mean_7 / median_14 / ewm_7。
+    positive_only=True 时忽略非正值 (专辑水晶球规则)。窗口内无有效值的条目为 NaN。
+    """
+    values = matrix.to_numpy(dtype='float64', na_value=np.nan)
+    if positive_only: values = np.where(values > 0, values, np.nan)
+    out = {}
+    for w in windows:
+        recent = values[-w:]
+        valid = ~np.isnan(recent)
+        counts = valid.sum(axis=0)
+        if "mean" in stats:
+            sums = np.where(valid, recent, 0).sum(axis=0)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                out[f"mean_{w}"] = np.where(counts > 0, sums / np.maximum(counts, 1), np.nan)
+        if "median" in stats:
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore", category=RuntimeWarning)
+                out[f"median_{w}"] = np.nanmedian(recent, axis=0) if len(recent) else np.full(values.shape[1], np.nan)
+    for span in ewm_spans:
+        masked = pd.DataFrame(values, index=matrix.index, columns=matrix.columns)
+        out[f"ewm_{span}"] = masked.ewm(span=span, ignore_na=True).mean().iloc[-1].to_numpy() if len(masked) else np.nan
+    return pd.DataFrame(out, index=matrix.columns)
+
+def item_stats(kind, windows=DEFAULT_WINDOWS, stats=DEFAULT_STATS, ewm_spans=(7,), positive_only=False,
+               data_dir=DATA_DIR, store_dir=history_store.STORE_DIR):
+    """所有单曲 (kind='songs') 或专辑 (kind='albums') 的滚动统计，宽表不变时复用结果"""
+    # 先取指纹再取宽表：期间若有新摄入，结果只会被记在旧指纹下，不会被误用
+    fp = history_store.fingerprint(kind, data_dir, store_dir)
+    key = ("stats", store_dir, kind, tuple(windows), tuple(stats), tuple(ewm_spans), positive_only)
+    cached = _CACHE.get(key, fp)
+    if cached is not None: return cached
+    matrix = history_store.history_matrix(kind, 'Daily', data_dir, store_dir)
+    result = rolling_stats(matrix, windows, stats, ewm_spans, positive_only)
+    result.attrs['n_days'] = len(matrix)
+    return _CACHE.put(key, fp, result)
+
+def clear_caches():
+    _CACHE.discard(lambda key: key[0] == "stats")
+
+# --- 供 app.py 使用的 7 日均值 ---
+def _window_mean(kind, window, positive_only, data_dir, store_dir):
+    windows = DEFAULT_WINDOWS if window in DEFAULT_WINDOWS else DEFAULT_WINDOWS + (window,)
+    result = item_stats(kind, windows=windows, positive_only=positive_only, data_dir=data_dir, store_dir=store_dir)
+    return result[f"mean_{window}"], result.attrs['n_days']
+
+def song_averages(window=7, data_dir=DATA_DIR, store_dir=history_store.STORE_DIR):
+    """每首歌最近 window 个文件的平均日增: {Song: avg}；数据不足两天时返回 {}"""
+    col, n_days = _window_mean("songs", window, False, data_dir, store_dir)
+    if min(n_days, window) < 2: return {}
+    return col.dropna().to_dict()
+
+def album_averages(window=7, data_dir=DATA_DIR, store_dir=history_store.STORE_DIR):
+    """每张专辑最近 window 个文件的平均日增 (忽略非正值): {Base_Name: avg}；无有效值记为 0"""
+    col, _ = _window_mean("albums", window, True, data_dir, store_dir)
+    return col.fillna(0).to_dict()
@@ -0,0 +1,221 @@
+"""
+看板快照：把 app.py 针对最新日期推导的所有数据 (Change 合并、份额、1B/100M 计数、
+水晶球卡片、Top-N 表格、生涯/月听众历史) 一次算好，写成一个紧凑的 pickle 文件。
+页面每次 rerun 只需反序列化快照再画图。
+
+每日上传后运行: python snapshot.py
+"""
+import os
+import pickle
+import argparse
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+import artists
+import history_store
+import rolling_stats
+import milestones
+import forecast
+import song_index
+from data_utils import DATA_DIR, listeners_count
+
+SNAPSHOT_VERSION = 9
+SNAPSHOT_FILE = os.path.join(history_store.STORE_DIR, "snapshot.pkl")
+
+# 默认艺人的水晶球专辑 (显示名 -> Base_Name)，各艺人的配置见 artists.py
+TARGET_ALBUMS_MAP = artists.ARIANA["albums_map"]
+
+def load_latest(data_dir=DATA_DIR, store_dir=history_store.STORE_DIR):
+    """
+    最新一天 (通过摄入校验) 的单曲/专辑/meta，直接取仓库中的规范化数据，不再重新解析原始文件；
+    没有数据时返回 None，当天没有专辑文件时专辑为 None
+    """
+    date_str = history_store.latest_date("songs", data_dir, store_dir)
+    if date_str is None: return None
+    df_songs = history_store.day_table("songs", date_str, data_dir, store_dir)
+    df_albums = history_store.day_table("albums", date_str, data_dir, store_dir)
+    meta_data = history_store.day_meta(date_str, data_dir, store_dir)
+    return df_songs, (df_albums if not df_albums.empty else None), meta_data, date_str
+
+def _with_change(df, key, kind, data_date, data_dir, store_dir):
+    """
+    较昨日 (Change) 与较上周同日 (Change_7)，由 history_store 按日历日对齐计算；
+    对应日期没有上传文件 (断档) 时为 NaN，不再拿"上一个文件"冒充昨天。返回 (df, 昨日是否断档)。
+    """
+    try: deltas = history_store.lag_deltas(kind, (1, 7), at=data_date, data_dir=data_dir, store_dir=store_dir)
+    except KeyError: deltas = None
+    # 单曲按身份索引对齐 (改名/乱码写法算同一首)
+    names = song_index.canonical_names(df[key], data_dir, store_dir) if kind == "songs" else df[key]
+    gaps = {}
+    for lag, col in ((1, 'Change'), (7, 'Change_7')):
+        gaps[lag] = deltas is None or deltas.empty or bool(deltas[f'Gap_{lag}'].iloc[0])
+        if gaps[lag]: df[col] = np.nan
+        else: df[col] = (df['Daily_Num'] - names.map(deltas[f'Prev_{lag}']).fillna(0)).astype('int64')
+    return df, gaps[1]
+
+def _listeners_change(l_hist):
+    """月听众较昨日变化；昨天没有数据时为 0"""
+    if len(l_hist) < 2: return 0
+    last, prev = pd.to_datetime(l_hist['Date'].iloc[-1]), pd.to_datetime(l_hist['Date'].iloc[-2])
+    if (last - prev).days != 1: return 0
+    return l_hist.iloc[-1]['Listeners'] - l_hist.iloc[-2]['Listeners']
+
+def _share(values, total):
+    if total > 0: return (values / total * 100).round(2).astype(str) + '%'
+    return "0%"
+
+def _crystal_ball(albums_df, album_avg_map, albums_map, data_date, data_dir, store_dir):
+    cb_df = pd.DataFrame({"Display": list(albums_map.keys()), "Album": list(albums_map.values())})
+    cb_df = cb_df.merge(albums_df.drop_duplicates('Base_Name')[['Base_Name', 'Total_Num', 'Daily_Num']],
+                        left_on='Album', right_on='Base_Name')
+    cb_df = cb_df[cb_df['Total_Num'] > 0]
+    avg_7day = cb_df['Album'].map(album_avg_map).fillna(0)
+    # 如果7日数据不足，使用当日数据作为Fallback
+    avg_7day = avg_7day.where(avg_7day != 0, cb_df['Daily_Num'])
+
+    # 所有专辑一次性向量化投影到下一个 1B
+    proj = milestones.project_milestones(cb_df['Total_Num'], avg_7day, step=milestones.MILESTONE_1B, now=data_date, index=cb_df.index)
+    # ETA、区间与速度改用 forecast 的衰减/星期模型 (Avg 为模型未来 7 天的预测日均，与 Days 出自同一模型)；
+    # 没有拟合结果的专辑 (历史不足) 保留 7 日均速的常数投影，两者都从数据日期起算
+    fc = forecast.milestone_forecast("albums", step=milestones.MILESTONE_1B, n_tiers=1, names=cb_df['Album'],
+                                     data_dir=data_dir, store_dir=store_dir).set_index('Name')
+    fc_col = lambda col, fallback: cb_df['Album'].map(fc[col]).fillna(fallback)
+    return pd.DataFrame({
+        "Album": cb_df['Album'],
+        "Display": cb_df['Display'],
+        "Total": proj['Total'],
+        "Avg": fc_col('Speed', proj['Speed']),
+        "Milestone": proj['Milestone'],
+        "Remaining": proj['Remaining'],
+        "Days": fc_col('Days', proj['Days']),
+        "Date": fc_col('ETA_Str', proj['ETA_Str']),
+        "Days_Lo": fc_col('Days_Lo', proj['Days']),
+        "Days_Hi": fc_col('Days_Hi', proj['Days']),
+        "Date_Lo": fc_col('ETA_Lo', proj['ETA_Str']),
+        "Date_Hi": fc_col('ETA_Hi', proj['ETA_Str']),
+    }).sort_values('Total', ascending=False, kind='stable').to_dict('records')
+
+def build_snapshot(data_dir=DATA_DIR, store_dir=history_store.STORE_DIR, albums_map=None):
+    """计算最新日期的完整看板数据；没有数据时返回 None"""
+    albums_map = TARGET_ALBUMS_MAP if albums_map is None else albums_map
+    history_store.ingest(data_dir, store_dir)
+    generation = history_store.load_manifest(store_dir)['generation']
+    latest = load_latest(data_dir, store_dir)
+    if latest is None: return None
+    songs_df, albums_df, today_meta, data_date = latest
+
+    # --- 单曲: Change / 排序 / 份额 / 7日均值 / 下一个 100M ---
+    songs_df, change_gap = _with_change(songs_df, 'Song', 'songs', data_date, data_dir, store_dir)
+    songs_df = songs_df.sort_values(by='Daily_Num', ascending=False).reset_index(drop=True)
+    career_total = today_meta.get('career_total', 0)
+    real_career_daily = songs_df['Daily_Num'].sum()
+    real_daily_change = songs_df['Change'].sum()
+    songs_df['Share'] = _share(songs_df['Daily_Num'], real_career_daily)
+    avg_7day_map = rolling_stats.song_averages(7, data_dir, store_dir)
+    songs_df['Avg_7Days'] = songs_df['Song'].map(avg_7day_map).fillna(songs_df['Daily_Num'])
+    song_proj = milestones.project_milestones(songs_df['Streams_Num'], songs_df['Avg_7Days'], step=milestones.MILESTONE_100M,
+                                              now=data_date, index=songs_df.index)
+    songs_df['Next_Milestone'] = milestones.milestone_labels(song_proj)
+
+    # --- 专辑: Change / 份额 / 水晶球 ---
+    crystal_ball = []
+    if albums_df is not None:
+        albums_df, _ = _with_change(albums_df, 'Base_Name', 'albums', data_date, data_dir, store_dir)
+        albums_df['Daily_Share'] = _share(albums_df['Daily_Num'], real_career_daily)
+        albums_df['Total_Share'] = _share(albums_df['Total_Num'], career_total)
+        crystal_ball = _crystal_ball(albums_df, rolling_stats.album_averages(7, data_dir, store_dir), albums_map, data_date, data_dir, store_dir)
+
+    # --- 月听众 ---
+    l_hist = history_store.listeners_history(data_dir, store_dir)
+    real_listeners_change = _listeners_change(l_hist)
+
+    songs_by_total = songs_df.sort_values('Streams_Num', ascending=False)
+    summary = {
+        "career_total": career_total,
+        "real_career_daily": real_career_daily,
+        "real_daily_change": real_daily_change,
+        "change_gap": change_gap,
+        "real_listeners_change": real_listeners_change,
+        "count_1b": int((songs_df['Streams_Num'] >= 1_000_000_000).sum()),
+        "count_100m": int((songs_df['Streams_Num'] >= 100_000_000).sum()),
+        "l_count": listeners_count(today_meta),
+        "l_rank": today_meta.get('listeners_rank', 0),
+        "l_peak": today_meta.get('listeners_peak', 0),
+        "l_pk_c": today_meta.get('listeners_pk_count', 0),
+    }
+    return {
+        "version": SNAPSHOT_VERSION,
+        "generation": generation,
+        # 昨日对比按 song_index 的规范名合并，改名覆盖文件变化后快照也要重建
+        "aliases": song_index.overrides_fingerprint(data_dir),
+        "built_at": datetime.now().isoformat(timespec='seconds'),
+        "data_date": data_date,
+        "meta": today_meta,
+        "summary": summary,
+        "songs": songs_df,
+        "albums": albums_df,
+        "top_song_daily": songs_df.iloc[0].to_dict(),
+        "top_song_total": songs_by_total.iloc[0].to_dict(),
+        "songs_top_daily": songs_df.head(150),
+        "songs_top_total": songs_by_total.head(150),
+        "albums_top_daily": albums_df.sort_values('Daily_Num', ascending=False).head(20) if albums_df is not None else None,
+        "albums_top_total": albums_df.sort_values('Total_Num', ascending=False).head(20) if albums_df is not None else None,
+        "crystal_ball": crystal_ball,
+        "career_history": history_store.career_history(data_dir, store_dir),
+        "listeners_history": l_hist,
+    }
+
+def save_snapshot(snap, path=SNAPSHOT_FILE):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, 'wb') as f: pickle.dump(snap, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+
+def load_snapshot(path=SNAPSHOT_FILE):
+    try:
+        with open(path, 'rb') as f: snap = pickle.load(f)
+    except Exception:
+        return None
+    return snap if snap and snap.get("version") == SNAPSHOT_VERSION else None
+
+def load_or_build(data_dir=DATA_DIR, store_dir=history_store.STORE_DIR, path=None, albums_map=None):
+    """快照与仓库 generation、改名覆盖文件都一致时直接使用，否则重新计算并回写 (默认写在 <store_dir>/snapshot.pkl)"""
+    path = path or os.path.join(store_dir, "snapshot.pkl")
+    history_store.ingest(data_dir, store_dir)
+    snap = load_snapshot(path)
+    if (snap is not None and snap["generation"] == history_store.generation(store_dir)
+            and snap["aliases"] == song_index.overrides_fingerprint(data_dir)):
+        return snap
+    snap = build_snapshot(data_dir, store_dir, albums_map)
+    if snap is not None:
+        try: save_snapshot(snap, path)
+        except OSError: pass
+    return snap
+
+def for_artist(key=None):
+    """按注册表中的艺人配置加载/构建快照"""
+    artist = artists.get(key)
+    return load_or_build(artist["data_dir"], artist["store_dir"], albums_map=artist["albums_map"])
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Precompute the Ari-Stats dashboard snapshot for the latest upload.")
+    parser.add_argument("--artist", default=None, help="registry key from artists.py / artists.json (sets the defaults below)")
+    parser.add_argument("--data-dir", default=None)
+    parser.add_argument("--store-dir", default=None)
+    parser.add_argument("--out", default=None, help="snapshot path (default: <store-dir>/snapshot.pkl)")
+    args = parser.parse_args(argv)
+    artist = artists.get(args.artist)
+    data_dir = args.data_dir or artist["data_dir"]
+    store_dir = args.store_dir or artist["store_dir"]
+    out = args.out or os.path.join(store_dir, "snapshot.pkl")
+    snap = build_snapshot(data_dir, store_dir, artist["albums_map"])
+    if snap is None:
+        print(f"No *_songs.csv found in {data_dir}")
+        return 1
+    save_snapshot(snap, out)
+    print(f"Snapshot for {snap['data_date']} written to {out} ({os.path.getsize(out):,} bytes)")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
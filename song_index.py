@@ -0,0 +1,317 @@
+"""
+单曲名称身份索引：跨日期把同一首歌的不同写法归为一个身份，在 ingest 时构建并落盘 (<store_dir>/identity/songs.json)。
+  - 规范键 name_key: 修复 UTF-8 被按 Latin-1/cp1252 读出的乱码 (Ã© / â€™)、NFKC、去掉重音符号、统一引号与破折号、忽略大小写和多余空白
+  - 规范键相同且从不在同一天同时出现的名称归为同一首 (编码漂移)
+  - 去掉合作者标注 (feat. / with / A & B) 后相同、时间上首尾相接且总量连续的条目归为同一首 (改名)
+  - 版本后缀 (- Live / - Remix / - live from Vevo ...) 在榜单里与原曲同时出现，是不同的音轨，不自动合并
+  - 人工覆盖: <data_dir>/name_aliases.json
+        {"aliases": {"名称": "归入的名称"}, "distinct": ["不参与自动合并的名称"]}
+每个身份以最近一次出现的写法为规范名 (与当天文件一致)；另建字符三元组倒排索引，供模糊查找和选择框的输入即搜。
+
+    python song_index.py                      # 列出被合并的身份
+    python song_index.py --search "dont call"
+"""
+import os
+import re
+import json
+import hashlib
+import bisect
+import unicodedata
+import numpy as np
+import pandas as pd
+
+import memcache
+import history_store
+from data_utils import DATA_DIR, normalize_text
+
+OVERRIDES_FILE = "name_aliases.json"
+INDEX_DIR = "identity"
+INDEX_FILE = "songs.json"
+NGRAM = 3
+# 改名判定: 旧名最后一次出现到新名第一次出现最多隔几天，以及总量跳变不超过 日增 × 天数 × CONTINUITY_FACTOR
+MAX_GAP_DAYS = 7
+CONTINUITY_FACTOR = 3
+SEARCH_LIMIT = 50
+# 模糊匹配: 查询的三元组至少有这个比例出现在名称中
+FUZZY_MIN = 0.5
+LOOKUP_MIN = 0.8
+
+_CACHE = memcache.SHARED
+
+# --- 规范键 ---
+# 乱码特征: UTF-8 多字节序列的首字节 (Â-ô) 后面跟着续字节被解码出的字符 (Latin-1 的 0x80-0xBF 或 cp1252 的符号)
+_MOJIBAKE = re.compile("[Â-ô][\u0080-¿ŒœŠšŸŽžƒˆ˜–-›€™]")
+_PUNCT = str.maketrans({"‘": "'", "’": "'", "`": "'", "´": "'", "“": '"', "”": '"',
+                        "‐": "-", "–": "-", "—": "-"})
+_CREDIT = re.compile(r"\s*[(\[](?:feat\.?|ft\.?|featuring|with)\s[^)\]]*[)\]]|\s*[(\[][^)\]]*&[^)\]]*[)\]]")
+
+def repair(text):
+    """还原被按 Latin-1/cp1252 误读的 UTF-8 (Monét <- MonÃ©t)；不是乱码或无法还原时原样返回"""
+    if not _MOJIBAKE.search(text): return text
+    try: raw = b"".join(ch.encode("cp1252") if ord(ch) > 0xFF else ch.encode("latin-1") for ch in text)
+    except UnicodeError: return text
+    try: return raw.decode("utf-8")
+    except UnicodeError: return text
+
+def name_key(name):
+    text = unicodedata.normalize("NFKD", repair(normalize_text(name)))
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    text = unicodedata.normalize("NFKC", text).translate(_PUNCT).casefold()
+    return " ".join(text.split())
+
+def base_key(key):
+    """去掉合作者标注后的键 ("the way (feat. mac miller)" -> "the way")"""
+    return " ".join(_CREDIT.sub("", key).split()) or key
+
+def _grams(key):
+    padded = f" {key} "
+    return {padded[i:i + NGRAM] for i in range(len(padded) - NGRAM + 1)}
+
+# --- 人工覆盖 ---
+def overrides_path(data_dir=DATA_DIR):
+    return os.path.join(data_dir, OVERRIDES_FILE)
+
+def _overrides_signature(data_dir):
+    try: st_ = os.stat(overrides_path(data_dir))
+    except OSError: return None
+    return [st_.st_mtime_ns, st_.st_size]
+
+def overrides_fingerprint(data_dir=DATA_DIR):
+    """覆盖文件的短指纹 (不存在时为 "none")；改名合并依赖它，快照、图表缓存和 API 的 ETag 都要带上"""
+    sig = _overrides_signature(data_dir)
+    return "none" if sig is None else hashlib.sha1(repr(sig).encode()).hexdigest()[:12]
+
+def load_overrides(data_dir=DATA_DIR):
+    try:
+        with open(overrides_path(data_dir), 'r', encoding='utf-8') as f: raw = json.load(f)
+    except (OSError, ValueError):
+        return {"aliases": {}, "distinct": []}
+    return {"aliases": dict(raw.get("aliases", {})), "distinct": list(raw.get("distinct", []))}
+
+# --- 构建 ---
+def _merge_groups(compact, overrides):
+    """紧凑历史 -> 身份分组 [[原始名称列号, ...], ...]，组内按优先级排列 (规范名在前)"""
+    names, present, streams, daily = compact["names"], compact["present"], compact["Streams"], compact["Daily"]
+    n_dates, n = present.shape
+    if not n: return []
+    keys = [name_key(x) for x in names]
+    first = present.argmax(axis=0)
+    last = n_dates - 1 - present[::-1].argmax(axis=0)
+    manual = set(overrides["distinct"])
+    col = {x: j for j, x in enumerate(names)}
+
+    def seen(cols): return present[:, cols].any(axis=1)
+
+    # 1) 规范键相同、从不同天出现 -> 同一首
+    by_key = {}
+    for j in np.lexsort((np.arange(n), first)):
+        if names[j] not in manual: by_key.setdefault(keys[j], []).append([int(j)])
+    units = []
+    for groups in by_key.values():
+        merged = [groups[0]]
+        for g in groups[1:]:
+            target = next((m for m in merged if not (seen(m) & seen(g)).any()), None)
+            if target is None: merged.append(g)
+            else: target.extend(g)
+        units.extend(merged)
+
+    # 2) 去掉合作者标注后相同，且首尾相接、总量连续 -> 改名
+    by_base = {}
+    for u in units: by_base.setdefault(base_key(keys[u[0]]), []).append(u)
+    chains = []
+    for group in by_base.values():
+        group.sort(key=lambda u: int(first[u].min()))
+        open_chains = []
+        for u in group:
+            start = int(first[u].min())
+            attached = False
+            for chain in open_chains:
+                end = int(last[chain].max())
+                gap = int((compact["dates"][start] - compact["dates"][end]).astype('int64'))
+                if gap < 1 or gap > MAX_GAP_DAYS or seen(chain)[start:].any(): continue
+                prev_total = int(streams[end, chain][present[end, chain]].max())
+                next_total = int(streams[start, u][present[start, u]].max())
+                pace = max(int(daily[end, chain].max()), int(daily[start, u].max()), 1)
+                if 0 <= next_total - prev_total <= pace * gap * CONTINUITY_FACTOR:
+                    chain.extend(u)
+                    attached = True
+                    break
+            if not attached: open_chains.append(list(u))
+        chains.extend(open_chains)
+
+    # 3) 人工覆盖: distinct 单独成组，aliases 把名称所在的整组并入目标名称所在的组
+    chains.extend([col[x]] for x in overrides["distinct"] if x in col)
+    owner = {j: c for c in chains for j in c}
+    for x, target in overrides["aliases"].items():
+        t = col.get(target, next((j for j, k in enumerate(keys) if k == name_key(target)), None))
+        if x not in col or t is None or owner[col[x]] is owner[t]: continue
+        src, dst = owner[col[x]], owner[t]
+        dst.extend(src)
+        for j in src: owner[j] = dst
+        src.clear()
+    chains = [c for c in chains if c]
+    # 组内优先级: 最近出现的在前 (即规范名)，其次出现天数多的
+    counts = present.sum(axis=0)
+    return [sorted(c, key=lambda j: (-int(last[j]), -int(counts[j]), str(names[j]))) for c in chains]
+
+def build(compact, overrides=None):
+    """由紧凑历史构建身份分组 {规范名: [原始名称, ...]} (规范名在列表首位)"""
+    overrides = overrides or {"aliases": {}, "distinct": []}
+    names = compact["names"]
+    return {str(names[g[0]]): [str(names[j]) for j in g] for g in _merge_groups(compact, overrides)}
+
+def _index(groups):
+    """分组 -> 查询结构 (规范名字典、别名表、规范键表、三元组倒排、词前缀表)"""
+    canonical = sorted(groups)
+    aliases, keys, grams, words = {}, {}, {}, []
+    search_keys, n_grams = [], np.zeros(len(canonical), dtype='int64')
+    for i, name in enumerate(canonical):
+        member_keys = []
+        for raw in groups[name]:
+            aliases[raw] = name
+            k = name_key(raw)
+            keys.setdefault(k, name)
+            if k not in member_keys: member_keys.append(k)
+        g = set().union(*(_grams(k) for k in member_keys))
+        n_grams[i] = len(g)
+        for gram in g: grams.setdefault(gram, []).append(i)
+        words.extend((w, i) for w in set(" ".join(member_keys).split()))
+        search_keys.append(" | ".join(member_keys))
+    words.sort()
+    return {
+        "names": pd.Index(canonical, name='Song'),
+        "members": [groups[x] for x in canonical],
+        "aliases": aliases,
+        "keys": keys,
+        "grams": {gram: np.asarray(ids, dtype='int64') for gram, ids in grams.items()},
+        "n_grams": n_grams,
+        "search_keys": search_keys,
+        "words": [w for w, _ in words],
+        "word_ids": np.asarray([i for _, i in words], dtype='int64'),
+    }
+
+# --- 落盘 / 加载 ---
+def _index_path(store_dir):
+    return os.path.join(store_dir, INDEX_DIR, INDEX_FILE)
+
+def generation(data_dir=DATA_DIR, store_dir=history_store.STORE_DIR):
+    """(songs 文件指纹, 覆盖文件签名)：两者任一变化，身份索引和合并后的历史都失效"""
+    return (history_store.fingerprint("songs", data_dir, store_dir), str(_overrides_signature(data_dir)))
+
+def update(data_dir=DATA_DIR, store_dir=history_store.STORE_DIR):
+    """重建身份分组并写入 <store_dir>/identity/songs.json (ingest 之后调用)，返回 {规范名: [原始名称]}"""
+    fp, sig = generation(data_dir, store_dir)
+    groups = build(history_store.compact_history("songs", data_dir, store_dir), load_overrides(data_dir))
+    os.makedirs(os.path.dirname(_index_path(store_dir)), exist_ok=True)
+    tmp = _index_path(store_dir) + ".tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump({"fingerprint": fp, "overrides": sig, "groups": groups}, f, ensure_ascii=False)
+    os.replace(tmp, _index_path(store_dir))
+    return groups
+
+def _load_groups(fp, sig, store_dir):
+    try:
+        with open(_index_path(store_dir), 'r', encoding='utf-8') as f: saved = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if saved.get("fingerprint") != fp or saved.get("overrides") != sig: return None
+    return saved["groups"]
+
+def load(data_dir=DATA_DIR, store_dir=history_store.STORE_DIR):
+    """身份索引 (按 generation 缓存)；落盘的分组过期 (例如只改了覆盖文件) 时重建"""
+    gen = generation(data_dir, store_dir)
+    cached = _CACHE.get(("identity", store_dir, "songs"), gen)
+    if cached is not None: return cached
+    groups = _load_groups(*gen, store_dir)
+    if groups is None: groups = update(data_dir, store_dir)
+    return _CACHE.put(("identity", store_dir, "songs"), gen, _index(groups))
+
+def merged_history(data_dir=DATA_DIR, store_dir=history_store.STORE_DIR):
+    """
+    按身份合并后的 songs 紧凑历史 (格式同 history_store.compact_history，names 为规范名)。
+    同一天有多个成员时取优先级最高的成员 (只有人工合并才可能出现)。
+    """
+    gen = generation(data_dir, store_dir)
+    key = ("compact", store_dir, "songs", "identity")
+    cached = _CACHE.get(key, gen)
+    if cached is not None: return cached
+    idx = load(data_dir, store_dir)
+    compact = history_store.compact_history("songs", data_dir, store_dir)
+    cols = compact["names"].get_indexer([raw for members in idx["members"] for raw in members])
+    ident = np.repeat(np.arange(len(idx["members"])), [len(m) for m in idx["members"]])
+    rank = np.concatenate([np.arange(len(m)) for m in idx["members"]]) if len(ident) else ident
+    shape = (len(compact["dates"]), len(idx["names"]))
+    out = {"Daily": np.zeros(shape, dtype='int64'), "Streams": np.zeros(shape, dtype='int64')}
+    present = np.zeros(shape, dtype=bool)
+    # 低优先级的成员先写，高优先级的覆盖 (同一优先级内每个身份只有一列)
+    for r in range(int(rank.max()) if len(rank) else -1, -1, -1):
+        js, ks = cols[rank == r], ident[rank == r]
+        p = compact["present"][:, js]
+        for value in out: out[value][:, ks] = np.where(p, compact[value][:, js], out[value][:, ks])
+        present[:, ks] |= p
+    merged = {"dates": compact["dates"], "names": idx["names"], **out, "present": present}
+    return _CACHE.put(key, gen, merged)
+
+# --- 查询 ---
+def resolve(name, data_dir=DATA_DIR, store_dir=history_store.STORE_DIR, fuzzy=False):
+    """原始名称/任意写法 -> 规范名；fuzzy=True 时再用三元组匹配兜底，找不到返回 None"""
+    idx = load(data_dir, store_dir)
+    if name in idx["aliases"]: return idx["aliases"][name]
+    canonical = idx["keys"].get(name_key(name))
+    if canonical is not None or not fuzzy: return canonical
+    hits = _ranked(idx, name_key(name), 1, LOOKUP_MIN)
+    return hits[0] if hits else None
+
+def members(name, data_dir=DATA_DIR, store_dir=history_store.STORE_DIR):
+    """某首歌 (任意写法) 的全部原始名称；不在索引中时只有它自己"""
+    idx = load(data_dir, store_dir)
+    canonical = resolve(name, data_dir, store_dir)
+    if canonical is None: return [name]
+    return idx["members"][idx["names"].get_loc(canonical)]
+
+def canonical_names(names, data_dir=DATA_DIR, store_dir=history_store.STORE_DIR):
+    """整列原始名称 -> 规范名 (不在索引中的保持原样)"""
+    aliases = load(data_dir, store_dir)["aliases"]
+    return names.map(aliases).fillna(names)
+
+def _ranked(idx, q, limit, min_score):
+    if len(q) < NGRAM:
+        # 一两个字符: 按词前缀在有序词表上二分，不逐条扫描
+        lo = bisect.bisect_left(idx["words"], q)
+        hi = bisect.bisect_left(idx["words"], q + "￿")
+        ids = list(dict.fromkeys(idx["word_ids"][lo:hi].tolist()))
+        return [idx["names"][i] for i in sorted(ids, key=lambda i: idx["names"][i])[:limit]]
+    grams = _grams(q)
+    postings = [idx["grams"][g] for g in grams if g in idx["grams"]]
+    if not postings: return []
+    counts = np.bincount(np.concatenate(postings), minlength=len(idx["names"]))
+    cand = np.flatnonzero(counts)
+    score = counts[cand] / len(grams)
+    contains = np.fromiter((q in idx["search_keys"][i] for i in cand), dtype=bool, count=len(cand))
+    keep = contains | (score >= min_score)
+    cand, score, contains = cand[keep], score[keep], contains[keep]
+    # 子串命中优先，其次按覆盖率，再按名称长度 (短的更接近)
+    order = np.lexsort((idx["n_grams"][cand], -score, ~contains))
+    return [idx["names"][i] for i in cand[order][:limit]]
+
+def search(query, limit=SEARCH_LIMIT, data_dir=DATA_DIR, store_dir=history_store.STORE_DIR):
+    """输入即搜: 返回最多 limit 个规范名 (旧写法也能搜到当前名称)，可容忍错字和缺失的标点"""
+    q = name_key(query)
+    if not q: return []
+    return _ranked(load(data_dir, store_dir), q, limit, FUZZY_MIN)
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Show merged song identities or search song names.")
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--store-dir", default=history_store.STORE_DIR)
+    parser.add_argument("--search")
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+    if args.search is not None:
+        for name in search(args.search, args.limit, args.data_dir, args.store_dir): print(name)
+    else:
+        idx = load(args.data_dir, args.store_dir)
+        merged = [(name, m) for name, m in zip(idx["names"], idx["members"]) if len(m) > 1]
+        print(f"{len(idx['aliases'])} names -> {len(idx['names'])} songs, {len(merged)} merged")
+        for name, m in merged: print(f"  {name}\n" + "".join(f"      <- {x}\n" for x in m[1:]), end="")
@@ -0,0 +1,171 @@
+"""
+合成数据生成器：按 daily_data 的真实格式写出 *_songs.csv / *_albums.csv / *_meta.json，
+用于在远超当前曲库规模的数据上压测各加载函数和历史仓库。
+
+覆盖加载器需要兼容的各种输入:
+  - 列名变体: Daily_Raw / Daily Raw / Daily，Streams_Num / Streams，Total_Num / Total / Streams
+  - 带千分位逗号和 "+" 号的数字
+  - 乱码 (â€™, â„¢) 和 "*" 前缀，这些应被 normalize_text 清理
+  - listeners 为数字或 {"count": ...}
+  - 偶发缺失的上传日 (日期断档)
+
+    python synthetic_data.py --out /tmp/synth --years 3 --songs 2000 --albums 40 --artists 2
+"""
+import os
+import json
+import argparse
+import numpy as np
+import pandas as pd
+
+SONG_SCHEMAS = [
+    # (名称列, 总量列, 日增列, 数字是否带格式)
+    ("Song", "Streams_Num", "Daily_Raw", False),
+    ("Song", "Streams", "Daily Raw", True),
+    ("Song", "Streams", "Daily", True),
+]
+ALBUM_SCHEMAS = [
+    ("Base_Name", "Total_Num", "Daily_Raw", False),
+    ("Base_Name", "Total", "Daily Raw", True),
+    ("Base_Name", "Streams", "Daily", True),
+]
+SUFFIXES = ["", "", "", "", " - Remix", " - live", " (feat. Guest) - Remix", " - live from Vevo", " - Acoustic"]
+WORDS = ["love", "rings", "sunshine", "positions", "side", "into", "you", "bang", "break", "free", "way",
+         "honey", "moon", "dangerous", "woman", "sweet", "god", "tears", "boy", "yes", "and", "friends",
+         "thank", "next", "needy", "motive", "intro", "pov", "christmas", "santa", "snow", "kiss"]
+
+def _slug(name):
+    return "".join(c.lower() if c.isalnum() else "_" for c in name).strip("_")
+
+def _fmt(values, signed=False):
+    """1234567 -> "1,234,567" / "+1,234,567" """
+    return pd.Series(values).map("{:+,}".format if signed else "{:,}".format)
+
+def _mojibake(names, rng, rate):
+    """
+    给部分名称加上乱码和 "*" 前缀：’ 写成 â€™、末尾加 â„¢、或加 "* " 前缀。
+    这些经 normalize_text 清理后都会还原为同一个名称。
+    """
+    names = names.copy()
+    hit = rng.random(len(names)) < rate
+    for i in np.flatnonzero(hit):
+        kind = rng.integers(3)
+        if kind == 0 and "’" in names[i]: names[i] = names[i].replace("’", "â€™")
+        elif kind == 1: names[i] = names[i] + "â„¢"
+        else: names[i] = "* " + names[i]
+    return names
+
+def _catalog(rng, n_items, n_days, artist, is_album):
+    """生成条目名称和每日增量模型参数 (发行日、基线、首发爆发、衰减、是否节日曲目)"""
+    names = []
+    used = set()
+    while len(names) < n_items:
+        title = " ".join(rng.choice(WORDS, rng.integers(1, 4))).title()
+        if rng.random() < 0.1: title = title.replace(" ", "’s ", 1) if " " in title else title + "’s"
+        if is_album: name = f"{title} ({artist})" if rng.random() < 0.2 else title
+        else: name = title + SUFFIXES[rng.integers(len(SUFFIXES))]
+        if name in used: name = f"{name} {len(names)}"
+        used.add(name)
+        names.append(name)
+    names = np.array(names, dtype=object)
+    # 大约 70% 在历史开始前已发行，其余在期间陆续发行
+    release = np.where(rng.random(n_items) < 0.7, -rng.integers(30, 3650, n_items), rng.integers(0, n_days, n_items))
+    base = rng.lognormal(13 if is_album else 9, 1.2, n_items)
+    burst = rng.uniform(2, 20, n_items)
+    tau = rng.uniform(10, 90, n_items)
+    holiday = np.array(["christmas" in n.lower() or "santa" in n.lower() or "snow" in n.lower() for n in names])
+    return {"names": names, "release": release, "base": base, "burst": burst, "tau": tau, "holiday": holiday}
+
+def _daily(cat, t, date, rng):
+    age = t - cat["release"]
+    live = age >= 0
+    level = cat["base"] * (1 + cat["burst"] * np.exp(-np.maximum(age, 0) / cat["tau"]))
+    if date.weekday() == 4: level = level * 1.08  # 周五新歌效应
+    if date.month == 12: level = np.where(cat["holiday"], level * (1 + 15 * date.day / 25 if date.day <= 25 else 2), level)
+    noise = rng.lognormal(0, 0.08, len(level))
+    return np.where(live, level * noise, 0).astype('int64'), live
+
+def _write_items(path, cat, totals, daily, live, schema, rng, mojibake_rate, is_album):
+    name_col, total_col, daily_col, formatted = schema
+    names = cat["names"][live]
+    if not is_album: names = _mojibake(names, rng, mojibake_rate)
+    total, inc = totals[live], daily[live]
+    df = pd.DataFrame({
+        name_col: names,
+        total_col: _fmt(total) if formatted else total,
+        daily_col: _fmt(inc, signed=True) if formatted else inc,
+    })
+    df.to_csv(path, index=False)
+
+def generate_artist(out_dir, artist="Synthetic Artist", years=1.0, n_songs=300, n_albums=12,
+                    start="2024-01-01", gap_rate=0.03, variant_rate=0.2, mojibake_rate=0.02, seed=0):
+    """为一位艺人写出 years 年的每日文件，返回写出的天数"""
+    rng = np.random.default_rng(seed)
+    os.makedirs(out_dir, exist_ok=True)
+    dates = pd.date_range(start, periods=max(int(years * 365), 1), freq="D")
+    songs = _catalog(rng, n_songs, len(dates), artist, False)
+    albums = _catalog(rng, n_albums, len(dates), artist, True)
+    # 已发行曲目的初始累计量
+    song_totals = (songs["base"] * np.maximum(-songs["release"], 0)).astype('int64')
+    album_totals = (albums["base"] * np.maximum(-albums["release"], 0)).astype('int64')
+    listeners = rng.uniform(3e7, 9e7)
+    written = 0
+    for t, date in enumerate(dates):
+        s_inc, s_live = _daily(songs, t, date, rng)
+        a_inc, a_live = _daily(albums, t, date, rng)
+        song_totals += s_inc
+        album_totals += a_inc
+        listeners *= rng.lognormal(0, 0.01)
+        # 偶发漏传：数据照常累积，只是这一天没有文件 (第一天和最后一天总会写出)
+        if 0 < t < len(dates) - 1 and rng.random() < gap_rate: continue
+        day = date.strftime("%Y-%m-%d")
+        s_schema = SONG_SCHEMAS[0] if rng.random() >= variant_rate else SONG_SCHEMAS[rng.integers(1, len(SONG_SCHEMAS))]
+        a_schema = ALBUM_SCHEMAS[0] if rng.random() >= variant_rate else ALBUM_SCHEMAS[rng.integers(1, len(ALBUM_SCHEMAS))]
+        _write_items(os.path.join(out_dir, f"{day}_songs.csv"), songs, song_totals, s_inc, s_live, s_schema, rng, mojibake_rate, False)
+        _write_items(os.path.join(out_dir, f"{day}_albums.csv"), albums, album_totals, a_inc, a_live, a_schema, rng, mojibake_rate, True)
+        l_val = int(listeners)
+        meta = {
+            "career_total": int(song_totals.sum()),
+            "listeners": {"count": l_val} if rng.random() < variant_rate / 2 else l_val,
+            "listeners_rank": int(rng.integers(1, 50)),
+            "listeners_peak": 1,
+            "listeners_pk_count": int(listeners * 1.4),
+        }
+        with open(os.path.join(out_dir, f"{day}_meta.json"), 'w') as f: json.dump(meta, f)
+        written += 1
+    return written
+
+def generate(out_dir, artists=1, **kwargs):
+    """
+    artists == 1 时直接写入 out_dir；多位艺人时写入 out_dir/<artist_slug>/。
+    返回 {艺人名: 数据目录}。
+    """
+    seed = kwargs.pop("seed", 0)
+    dirs = {}
+    for i in range(artists):
+        artist = "Synthetic Artist" if artists == 1 else f"Synthetic Artist {i + 1}"
+        data_dir = out_dir if artists == 1 else os.path.join(out_dir, _slug(artist))
+        generate_artist(data_dir, artist=artist, seed=seed + i, **kwargs)
+        dirs[artist] = data_dir
+    return dirs
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate synthetic daily_data files for scale testing.")
+    parser.add_argument("--out", required=True)
+    parser.add_argument("--years", type=float, default=1.0)
+    parser.add_argument("--songs", type=int, default=300)
+    parser.add_argument("--albums", type=int, default=12)
+    parser.add_argument("--artists", type=int, default=1)
+    parser.add_argument("--start", default="2024-01-01")
+    parser.add_argument("--gap-rate", type=float, default=0.03, help="probability that a day has no upload")
+    parser.add_argument("--variant-rate", type=float, default=0.2, help="probability that a file uses a legacy column layout")
+    parser.add_argument("--mojibake-rate", type=float, default=0.02)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    dirs = generate(args.out, artists=args.artists, years=args.years, n_songs=args.songs, n_albums=args.albums,
+                    start=args.start, gap_rate=args.gap_rate, variant_rate=args.variant_rate,
+                    mojibake_rate=args.mojibake_rate, seed=args.seed)
+    for artist, data_dir in dirs.items(): print(f"{artist}: {data_dir}")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
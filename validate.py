@@ -0,0 +1,203 @@
+"""
+摄入校验与修复：每个原始文件只在 ingest 时解析、校验一次，结果 (问题列表) 记在 manifest 里。
+  - 识别列名变体 (Daily_Raw / Daily Raw / Daily ...)，统一为规范列，数字清洗为 int64
+  - 修复: 无法解析的数字记为 0、重名条目只保留第一条、名称为空的行丢弃
+  - 文件级隔离: 读不出来、缺少名称列、没有数据行、文件名不是日期的文件不进入仓库 (quarantined)
+  - 序列检查: 同一条目的总量不应下降；相邻两天都有更新时，日增应与总量差一致
+报告写在 <store_dir>/validation/ 下 (quarantine.json 以及 songs.parquet / albums.parquet 的逐条记录)，
+之后仓库里的数据都是规范列，下游读取无需再做防御性处理。
+
+    python validate.py          # 摄入并打印报告摘要
+"""
+import os
+import re
+import json
+import numpy as np
+import pandas as pd
+
+from data_utils import (
+    READ_OPTIONS, META_FIELDS, date_of, detect_schema, clean_numbers, normalize_texts,
+    read_meta_file, listeners_count, open_daily,
+)
+
+VALIDATION_DIR = "validation"
+REPORT_FILE = "quarantine.json"
+# 日增与总量差的允许偏差: 超过 max(日增 × DAILY_TOLERANCE, MIN_MISMATCH) 才记录
+DAILY_TOLERANCE = 0.05
+MIN_MISMATCH = 1000
+
+_DATE_RE = re.compile(r"\d{4}-\d{2}-\d{2}$")
+
+class QuarantineError(Exception):
+    """文件无法修复，不进入仓库"""
+
+def _issue(check, **info):
+    return {"check": check, **info}
+
+# --- 单文件 ---
+def _parse_items(kind, path, issues, variant):
+    is_album = kind == "albums"
+    name_col = 'Base_Name' if is_album else 'Song'
+    with open_daily(path) as f: df = pd.read_csv(f, **READ_OPTIONS)
+    if name_col not in df.columns: raise QuarantineError(f"missing column {name_col}")
+    if df.empty: raise QuarantineError("no rows")
+    schema = detect_schema(df.columns, is_album)
+    variant.update({col: src for col, src in schema.items() if src is not None and src != col})
+
+    values = {}
+    for col, source in schema.items():
+        if source is None:
+            issues.append(_issue("missing_column", column=col))
+            values[col] = np.zeros(len(df), dtype='int64')
+            continue
+        cleaned, invalid = clean_numbers(df[source], return_invalid=True)
+        if invalid.any(): issues.append(_issue("non_numeric", column=source, count=int(invalid.sum())))
+        values[col] = cleaned.to_numpy(dtype='int64')
+
+    names = normalize_texts(df[name_col]) if not is_album else df[name_col].astype(str)
+    total_col = 'Total_Num' if is_album else 'Streams_Num'
+    part = pd.DataFrame({'Date': date_of(path), 'Name': names.astype(str),
+                         'Streams': values[total_col], 'Daily': values['Daily_Num']})
+    blank = df[name_col].isna().to_numpy() | (part['Name'] == '').to_numpy()
+    if blank.any():
+        issues.append(_issue("blank_names", count=int(blank.sum())))
+        part = part[~blank]
+    negative = int(((part['Streams'] < 0) | (part['Daily'] < 0)).sum())
+    if negative: issues.append(_issue("negative", count=negative))
+    # 同一天同名条目只保留第一条 (与旧版 row.iloc[0] 一致)
+    deduped = part.drop_duplicates('Name', keep='first')
+    if len(deduped) < len(part): issues.append(_issue("duplicate_names", count=len(part) - len(deduped)))
+    if deduped.empty: raise QuarantineError("no valid rows")
+    return deduped.reset_index(drop=True)
+
+def _parse_meta(path, issues, variant):
+    meta = read_meta_file(path)
+    if not isinstance(meta, dict): raise QuarantineError("meta is not a JSON object")
+    if isinstance(meta.get('listeners'), dict): variant['listeners'] = "listeners.count"
+    row = {'Date': date_of(path)}
+    for k in META_FIELDS:
+        if k not in meta: issues.append(_issue("missing_column", column=k))
+        value = listeners_count(meta) if k == 'listeners' else meta.get(k, 0)
+        try: row[k] = int(value)
+        except (TypeError, ValueError):
+            issues.append(_issue("non_numeric", column=k, count=1))
+            row[k] = 0
+    return pd.DataFrame([row])
+
+def parse_file(kind, path):
+    """
+    解析并校验单个原始文件，返回 (规范化长表片段 或 None, 问题列表, 列名变体)。
+    片段列为 Date, Name, Streams, Daily (meta 为 Date + META_FIELDS)；None 表示文件被隔离。
+    列名变体为 {规范列: 原始列名}，只记录与规范列不同的列 (属于正常格式，不算问题)。
+    """
+    issues, variant = [], {}
+    try:
+        if not _DATE_RE.match(date_of(path)): raise QuarantineError("file name does not start with YYYY-MM-DD")
+        part = _parse_meta(path, issues, variant) if kind == "meta" else _parse_items(kind, path, issues, variant)
+        return part, issues, variant
+    except QuarantineError as e:
+        issues.append(_issue("quarantined", reason=str(e)))
+    except Exception as e:
+        issues.append(_issue("quarantined", reason=f"unreadable: {type(e).__name__}: {e}"))
+    return None, issues, variant
+
+# --- 序列检查 ---
+def series_issues(compact):
+    """
+    在紧凑历史 (history_store.compact_history) 上检查所有条目，返回 DataFrame[Date, Name, Check, Value, Expected]:
+      total_decrease  总量比上一次上传时少
+      daily_mismatch  连续两天都有更新 (总量变化) 时，当天日增与总量差不符
+    总量没变的行 (源站当天未刷新) 不参与日增检查。
+    """
+    dates, names = compact['dates'], compact['names']
+    streams, daily, present = compact['Streams'], compact['Daily'], compact['present']
+    if len(dates) < 2: return pd.DataFrame(columns=['Date', 'Name', 'Check', 'Value', 'Expected'])
+    both = present[1:] & present[:-1]
+    delta = np.diff(streams, axis=0)
+    consecutive = both & (np.diff(dates).astype('int64') == 1)[:, None]
+    fresh = consecutive & (delta != 0)
+    prev_fresh = np.zeros_like(fresh)
+    prev_fresh[1:] = fresh[:-1]
+    tolerance = np.maximum(np.abs(daily[1:]) * DAILY_TOLERANCE, MIN_MISMATCH)
+    checks = (
+        ("total_decrease", both & (delta < 0), streams[1:], streams[:-1]),
+        ("daily_mismatch", fresh & prev_fresh & (np.abs(daily[1:] - delta) > tolerance), daily[1:], delta),
+    )
+    parts = []
+    for check, mask, value, expected in checks:
+        rows, cols = np.nonzero(mask)
+        parts.append(pd.DataFrame({'Date': np.datetime_as_string(dates[rows + 1], unit='D').astype(object),
+                                   'Name': names[cols].astype(object), 'Check': check,
+                                   'Value': value[rows, cols], 'Expected': expected[rows, cols]}))
+    return pd.concat(parts, ignore_index=True).sort_values(['Date', 'Check', 'Name'], kind='stable').reset_index(drop=True)
+
+# --- 报告 ---
+def _path(store_dir, name):
+    return os.path.join(store_dir, VALIDATION_DIR, name)
+
+def file_status(entry):
+    if not entry.get('segment'): return "quarantined"
+    return "repaired" if entry.get('issues') else "ok"
+
+def _variant_counts(manifest):
+    """各类文件的列名变体及文件数: {kind: {"Daily_Num<-Daily_Raw, ...": n}}，规范格式记为 "canonical" """
+    counts = {}
+    for e in manifest['files'].values():
+        label = ", ".join(f"{k}<-{v}" for k, v in sorted(e.get('schema', {}).items())) or "canonical"
+        kind = counts.setdefault(e['kind'], {})
+        kind[label] = kind.get(label, 0) + 1
+    return counts
+
+def write_report(manifest, series, store_dir, errors=None):
+    """
+    manifest: history_store 的 manifest (每个文件的 issues 已在摄入时记录)
+    series: {kind: series_issues(...)}；errors: 摄入后续步骤的失败 {步骤: 错误信息} (例如异常检测)
+    写出 quarantine.json 与逐条的 <kind>.parquet，返回报告 dict
+    """
+    os.makedirs(_path(store_dir, ""), exist_ok=True)
+    files = {fname: {"kind": e['kind'], "date": e['date'], "status": file_status(e), "issues": e.get('issues', [])}
+             for fname, e in sorted(manifest['files'].items()) if file_status(e) != "ok"}
+    report = {
+        "generation": manifest['generation'],
+        "counts": {status: sum(file_status(e) == status for e in manifest['files'].values())
+                   for status in ("ok", "repaired", "quarantined")},
+        "schemas": _variant_counts(manifest),
+        "series": {kind: df['Check'].value_counts().to_dict() for kind, df in series.items()},
+        "files": files,
+        "errors": dict(errors or {}),
+    }
+    for kind, df in series.items(): df.to_parquet(_path(store_dir, f"{kind}.parquet"), index=False)
+    tmp = _path(store_dir, REPORT_FILE + ".tmp")
+    with open(tmp, 'w', encoding='utf-8') as f: json.dump(report, f, ensure_ascii=False, indent=1)
+    os.replace(tmp, _path(store_dir, REPORT_FILE))
+    return report
+
+def load_report(store_dir):
+    """读取 quarantine.json；尚未生成时返回 None"""
+    try:
+        with open(_path(store_dir, REPORT_FILE), 'r', encoding='utf-8') as f: return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def load_series_issues(kind, store_dir):
+    try: return pd.read_parquet(_path(store_dir, f"{kind}.parquet"))
+    except OSError: return pd.DataFrame(columns=['Date', 'Name', 'Check', 'Value', 'Expected'])
+
+if __name__ == "__main__":
+    import argparse
+    import history_store
+    from data_utils import DATA_DIR
+    parser = argparse.ArgumentParser(description="Ingest daily files and print the validation report.")
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--store-dir", default=history_store.STORE_DIR)
+    args = parser.parse_args()
+    history_store.ingest(args.data_dir, args.store_dir)
+    report = load_report(args.store_dir)
+    if report is None: raise SystemExit("no validation report (nothing ingested yet)")
+    print("files:", report["counts"])
+    print("schemas:", report["schemas"])
+    print("series:", report["series"])
+    for step, error in report.get("errors", {}).items(): print(f"  FAILED {step}: {error}")
+    for fname, info in report["files"].items():
+        print(f"  {info['status']:<11} {fname}: " + "; ".join(
+            ", ".join(f"{k}={v}" for k, v in issue.items()) for issue in info["issues"]))